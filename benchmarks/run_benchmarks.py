@@ -0,0 +1,309 @@
+"""
+オフラインベンチマーク（パーサ・タグ付け・items.json 出力）
+
+benchmarks/fixtures/ に保存したHTML/JSONだけを使い、BOOTHやGoogleには一切アクセスしない。
+シート系の関数は fetch を含めて計測するため、fixtures をローカルHTTPサーバで配信する。
+
+計測対象:
+- booth_scraper.parse_item_detail_page   (HTML文字列の高速パス / BeautifulSoup パス)
+- scraper_world.fetch_sheet_data         (WORLD シートの pubhtml/sheet)
+- scraper_knowledge.fetch_sheet_data     (複数シートの pubhtml から KNOWLEDGE を探す)
+- auto_tagger.tag_all_items              (コーパスサイズ別)
+- run_pipeline.merge_catalog のマージ→タグ付け→items.json 出力 (コーパスサイズ別)
+
+結果は JSON で出力する。リリース間で比較して性能劣化を検知する用途。
+
+Usage:
+    python benchmarks/run_benchmarks.py                        # 結果を標準出力へ
+    python benchmarks/run_benchmarks.py --output bench.json    # ファイルへ
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 --repeat 3 --filter tag_all_items
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+sys.path.insert(0, str(ROOT / "scripts"))
+
+# ベンチマーク中は HTTP キャッシュを使わない（毎回同じ条件で計測する）
+os.environ.setdefault("VRC_HTTP_CACHE", "0")
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import auto_tagger  # noqa: E402
+import booth_scraper  # noqa: E402
+from catalog_db import CatalogDB  # noqa: E402
+import run_pipeline  # noqa: E402
+import scraper_knowledge  # noqa: E402
+import scraper_world  # noqa: E402
+import sheet_source  # noqa: E402
+
+SCHEMA_VERSION = 1
+DEFAULT_SIZES = (1000, 10000, 50000)
+DEFAULT_REPEAT = 5
+
+BOOTH_FIXTURES = ("booth_item_costume.html", "booth_item_hair.html", "booth_item_r18.html")
+WORLD_FIXTURE = "sheet_world.html"
+WORKBOOK_FIXTURE = "sheet_workbook_pubhtml.html"
+ITEMS_FIXTURE = "items_sample.json"
+
+
+# ========================================
+# 計測ユーティリティ
+# ========================================
+
+def measure(
+    func: Callable[[Any], Any],
+    setup: Optional[Callable[[], Any]] = None,
+    repeat: int = DEFAULT_REPEAT,
+) -> dict:
+    """func(setup()) を repeat 回計測し、統計値とピークメモリを返す。setup は計測外。"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+
+    # ピークメモリは tracemalloc のオーバーヘッドが時間計測に混ざらないよう別実行
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "max_s": max(times),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+class FixtureServer:
+    """fixtures ディレクトリを配信するローカルHTTPサーバ（with 文で使う）。"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._server = None
+
+    def __enter__(self) -> "FixtureServer":
+        class QuietHandler(http.server.SimpleHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+        handler = functools.partial(QuietHandler, directory=str(self.directory))
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/{name}"
+
+
+def make_corpus(size: int) -> list[dict]:
+    """items_sample.json を複製して size 件のスクレイピング結果（タグ付け前）を作る。"""
+    with open(FIXTURES / ITEMS_FIXTURE, "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    corpus = []
+    for n in range(size):
+        item = dict(sample[n % len(sample)])
+        item_id = 10_000_000 + n
+        item["id"] = f"booth-{item_id}"
+        item["boothUrl"] = f"https://booth.pm/ja/items/{item_id}"
+        corpus.append(item)
+    return corpus
+
+
+# ========================================
+# ベンチマーク定義
+# ========================================
+
+def bench_parse_detail(repeat: int) -> list[dict]:
+    results = []
+    for name in BOOTH_FIXTURES:
+        html_text = (FIXTURES / name).read_text(encoding="utf-8")
+        url = f"https://booth.pm/ja/items/{name}"
+        results.append({
+            "name": "parse_item_detail_page[html]",
+            "params": {"fixture": name, "bytes": len(html_text.encode("utf-8"))},
+            **measure(lambda _: booth_scraper.parse_item_detail_page(html_text, url), repeat=repeat),
+        })
+        results.append({
+            "name": "parse_item_detail_page[soup]",
+            "params": {"fixture": name, "bytes": len(html_text.encode("utf-8"))},
+            **measure(
+                lambda _: booth_scraper.parse_item_detail_page(BeautifulSoup(html_text, "html.parser"), url),
+                repeat=repeat,
+            ),
+        })
+    return results
+
+
+def bench_sheets(repeat: int) -> list[dict]:
+    # ブックは1回の実行で1回だけ取得されるので、毎回取り直させて取得から計測する
+    with FixtureServer(FIXTURES) as server:
+        world_url = server.url(WORLD_FIXTURE)
+        workbook_url = server.url(WORKBOOK_FIXTURE)
+        # 単一シートの出力にはタブの gid が無いので、最初の表を読ませる
+        world_rows = len(scraper_world.fetch_sheet_data(gid=None, url=world_url))
+        knowledge_rows = len(scraper_knowledge.fetch_sheet_data(url=workbook_url))
+        return [
+            {
+                "name": "scraper_world.fetch_sheet_data",
+                "params": {"fixture": WORLD_FIXTURE, "rows": world_rows},
+                **measure(
+                    lambda _: scraper_world.fetch_sheet_data(gid=None, url=world_url),
+                    setup=sheet_source.clear_workbooks,
+                    repeat=repeat,
+                ),
+            },
+            {
+                "name": "scraper_knowledge.fetch_sheet_data",
+                "params": {"fixture": WORKBOOK_FIXTURE, "rows": knowledge_rows},
+                **measure(
+                    lambda _: scraper_knowledge.fetch_sheet_data(url=workbook_url),
+                    setup=sheet_source.clear_workbooks,
+                    repeat=repeat,
+                ),
+            },
+        ]
+
+
+def bench_tagging(sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    for size in sizes:
+        corpus = make_corpus(size)
+        results.append({
+            "name": "auto_tagger.tag_all_items",
+            "params": {"size": size},
+            **measure(auto_tagger.tag_all_items, setup=lambda: corpus, repeat=repeat),
+        })
+    return results
+
+
+def bench_merge_dump(sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = Path(tmp) / "items.json"
+        catalog_path = Path(tmp) / "items.sqlite"
+        for size in sizes:
+            existing = auto_tagger.tag_all_items(make_corpus(size))
+            # 日次実行相当: 既存の1割を再取得 + 5%の新規
+            refreshed = existing[: size // 10]
+            added = make_corpus(size + size // 20)[size:]
+            new_items = refreshed + added
+
+            def setup():
+                catalog_path.unlink(missing_ok=True)
+                store = CatalogDB(catalog_path)
+                store.upsert(existing)
+                return store, [dict(i) for i in new_items]
+
+            def step(args):
+                store, fetched = args
+                with store:
+                    run_pipeline.merge_catalog(store, fetched, output_path)
+
+            results.append({
+                "name": "run_pipeline.merge_sort_dump",
+                "params": {"size": size, "new_items": len(new_items)},
+                **measure(step, setup=setup, repeat=repeat),
+            })
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: list[int], repeat: int, name_filter: Optional[str] = None) -> dict:
+    """全ベンチマークを実行し、結果ドキュメント（JSON化可能な dict）を返す。"""
+    suites = [
+        (("parse_item_detail_page[html]", "parse_item_detail_page[soup]"), lambda: bench_parse_detail(repeat)),
+        (("scraper_world.fetch_sheet_data", "scraper_knowledge.fetch_sheet_data"), lambda: bench_sheets(repeat)),
+        (("auto_tagger.tag_all_items",), lambda: bench_tagging(sizes, repeat)),
+        (("run_pipeline.merge_sort_dump",), lambda: bench_merge_dump(sizes, repeat)),
+    ]
+    results = []
+    for names, suite in suites:
+        if name_filter and not any(name_filter in name for name in names):
+            continue
+        for result in suite():
+            if name_filter and name_filter not in result["name"]:
+                continue
+            results.append(result)
+            print(
+                f"{result['name']:<38} {json.dumps(result['params'], ensure_ascii=False):<48} "
+                f"median {result['median_s'] * 1000:9.2f} ms  peak {result['peak_kib']:10.1f} KiB",
+                file=sys.stderr,
+            )
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "gitCommit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRC-LIFE Portal オフラインベンチマーク")
+    parser.add_argument("--output", type=str, default=None, help="結果JSONの出力先（デフォルト: 標準出力）")
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="タグ付け・マージのコーパスサイズ（カンマ区切り）",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="各ベンチマークの繰り返し回数")
+    parser.add_argument("--filter", type=str, default=None, help="名前にこの文字列を含むベンチマークだけ出力")
+    args = parser.parse_args()
+
+    # スクレイパーのINFOログで結果が埋もれないようにする
+    logging.disable(logging.INFO)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_benchmarks(sizes, args.repeat, args.filter)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+// data-url.js
+// publish.py が書く dist/manifest.json から内容ハッシュ付きの公開ファイルを引く（各ページ共通）。
+// データを読むページのスクリプトより先に読み込む。
+
+const DATA_MANIFEST_URL = '../data/dist/manifest.json';
+let dataManifestRequest = null;
+
+// dist/manifest.json（無い・読めない場合は null）。ページ内で1回だけ取得する
+function loadDataManifest() {
+    if (!dataManifestRequest) {
+        dataManifestRequest = fetch(DATA_MANIFEST_URL, { cache: 'no-cache' })
+            .then(response => (response.ok ? response.json() : null))
+            .catch(error => {
+                console.warn('Data manifest not available:', error);
+                return null;
+            });
+    }
+    return dataManifestRequest;
+}
+
+// 論理名（items, worlds など）の manifest のエントリ（無ければ null）
+async function getDataEntry(name) {
+    const manifest = await loadDataManifest();
+    return (manifest && manifest.files && manifest.files[name]) || null;
+}
+
+// 論理名の公開ファイルの URL（manifest が無い・該当が無い場合は元のファイル）
+async function resolveDataUrl(name, fallbackUrl) {
+    const entry = await getDataEntry(name);
+    return entry ? '../data/' + entry.file : fallbackUrl;
+}
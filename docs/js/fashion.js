@@ -1,10 +1,18 @@
 /**
  * VRC-LIFE Portal Fashion - Dynamic Item System
  *
- * items.json からアイテムデータを読み込み、
+ * アイテムデータを読み込み、
  * NEW ARRIVALS（index.html）と ITEM LIST（list.html）に動的表示する。
+ *
+ * データはパイプラインが書き出すシャード（data/shards/）から必要な分だけ取得する。
+ * - NEW ARRIVALS: shards/new-arrivals.json（最新10件）
+ * - ITEM LIST: shards/manifest.json を見て、種別/対象で絞っていればそのシャード、
+ *   絞っていなければ items.json（全件）
+ * manifest が無い場合は従来通り items.json を使う。
  */
 
+const DATA_BASE = '../data/';
+
 document.addEventListener('DOMContentLoaded', () => {
 
     // === NEW ARRIVALS (index.html) ===
@@ -27,7 +35,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
 async function loadNewArrivals(container) {
     try {
-        const response = await fetch('../data/items.json');
+        let response = await fetch(DATA_BASE + 'shards/new-arrivals.json');
+        if (!response.ok) {
+            response = await fetch(DATA_BASE + 'items.json');
+        }
         const data = await response.json();
 
         // 最新10件を表示
@@ -96,16 +107,88 @@ let currentTaste = null;
 let currentType = null; // Item Type (Avatar, Costume, etc.)
 let searchQuery = '';
 
+let shardManifest = null;   // shards/manifest.json（無ければ null）
+let publishedItemsFile = null;  // dist/manifest.json の items（内容ハッシュ付き、無ければ null）
+const loadedFiles = {};     // ファイル名 → items（取得済みのシャード）
+let fullItemsLoaded = false;
+let renderSeq = 0;          // 連続クリック時に古い描画結果を捨てるための連番
+
+async function fetchItemsFile(file) {
+    if (!loadedFiles[file]) {
+        loadedFiles[file] = fetch(DATA_BASE + file)
+            .then(response => {
+                if (!response.ok) throw new Error(`${file}: ${response.status}`);
+                return response.json();
+            })
+            .catch(error => {
+                delete loadedFiles[file];
+                throw error;
+            });
+    }
+    return loadedFiles[file];
+}
+
+async function loadManifest() {
+    try {
+        const [shards, entry] = await Promise.all([
+            fetch(DATA_BASE + 'shards/manifest.json', { cache: 'no-cache' }),
+            getDataEntry('items'),  // data-url.js
+        ]);
+        if (shards.ok) {
+            shardManifest = await shards.json();
+        }
+        // 全件は publish.py の空白なし・ハッシュ付きファイルを使う
+        // （シャードと別の実行のものならアイテムがずれるので使わない）
+        if (entry && (!shardManifest || entry.lastUpdated === shardManifest.lastUpdated)) {
+            publishedItemsFile = entry.file;
+        }
+    } catch (error) {
+        console.warn('Shard manifest not available, using items.json:', error);
+    }
+}
+
+/**
+ * 現在のフィルターに必要なアイテム集合を返す。
+ * 全件を取得済みならそれを使い、そうでなければ種別 → 対象の順で
+ * 該当するシャードだけを取得する（残りの条件は getFilteredItems で絞る）。
+ */
+async function getSourceItems() {
+    const itemsFile = publishedItemsFile || (shardManifest ? shardManifest.items.file : 'items.json');
+    if (fullItemsLoaded || !shardManifest) {
+        const data = await fetchItemsFile(itemsFile);
+        fullItemsLoaded = true;
+        return data;
+    }
+    if (currentType) {
+        const entry = shardManifest.types[currentType];
+        if (!entry) return { items: [], lastUpdated: shardManifest.lastUpdated };
+        return fetchItemsFile(entry.file);
+    }
+    if (currentGender !== 'ALL' && shardManifest.genders[currentGender]) {
+        return fetchItemsFile(shardManifest.genders[currentGender].file);
+    }
+    const data = await fetchItemsFile(itemsFile);
+    fullItemsLoaded = true;
+    return data;
+}
+
 async function loadItemList(container) {
     try {
-        const response = await fetch('../data/items.json');
-        const data = await response.json();
-        allItems = data.items;
+        // list.html?type=COSTUME / ?gender=MEN'S で開いた場合はそのシャードだけ取得する
+        const params = new URLSearchParams(window.location.search);
+        if (params.get('type')) currentType = params.get('type');
+        if (params.get('gender')) currentGender = params.get('gender');
+        syncFilterButtons();
+
+        await loadManifest();
+        const [data] = await Promise.all([getSourceItems(), loadFacets()]);
+        setSourceItems(data.items);
 
         // 最終更新日時を表示
         const dateEl = document.getElementById('last-updated');
-        if (dateEl && data.lastUpdated) {
-            const d = new Date(data.lastUpdated);
+        const lastUpdated = (shardManifest && shardManifest.lastUpdated) || data.lastUpdated;
+        if (dateEl && lastUpdated) {
+            const d = new Date(lastUpdated);
             dateEl.textContent = `Last Updated: ${d.toLocaleDateString('ja-JP')}`;
         }
 
@@ -127,7 +210,264 @@ async function loadItemList(container) {
     }
 }
 
+// URL パラメータで指定されたフィルターをボタンの見た目に反映する
+function syncFilterButtons() {
+    document.querySelectorAll('.gender-tab').forEach(btn => {
+        const active = btn.getAttribute('data-gender') === currentGender;
+        btn.classList.toggle('active', active);
+        btn.classList.toggle('bg-[#333333]', active);
+        btn.classList.toggle('text-white', active);
+        btn.classList.toggle('hover:bg-gray-100', !active);
+    });
+    document.querySelectorAll('.type-filter').forEach(btn => {
+        const active = btn.getAttribute('data-type') === currentType;
+        btn.classList.toggle('text-black', active);
+        btn.classList.toggle('underline', active);
+        btn.classList.toggle('font-bold', active);
+    });
+}
+
+// フィルター変更時: 必要なシャードを取得してから描画する
+async function refreshItems(container) {
+    const seq = ++renderSeq;
+    try {
+        const data = await getSourceItems();
+        if (seq !== renderSeq) return;
+        setSourceItems(data.items);
+        renderItems(container);
+    } catch (error) {
+        console.error('Failed to load items:', error);
+        container.innerHTML = '<p class="text-center text-gray-400 col-span-full">アイテムの読み込みに失敗しました</p>';
+    }
+}
+
+// ========================================
+// ファセット（shards/facets.json のビットマップ）
+// ========================================
+
+let facetIndex = null;      // { ids, total, bitmaps: { gender|taste|type: { value: Uint32Array } } }
+let itemsById = new Map();  // 現在の allItems の id → item
+
+async function loadFacets() {
+    const entry = shardManifest && shardManifest.facets;
+    if (!entry) return;
+    try {
+        const response = await fetch(DATA_BASE + entry.file);
+        if (!response.ok) return;
+        const data = await response.json();
+        // 別の実行で書かれたものはビット番号がずれるので使わない
+        if (data.lastUpdated !== shardManifest.lastUpdated) return;
+        const bitmaps = {};
+        for (const [facet, values] of Object.entries(data.facets)) {
+            bitmaps[facet] = {};
+            for (const [value, { bitmap }] of Object.entries(values)) {
+                bitmaps[facet][value] = decodeBitmap(bitmap);
+            }
+        }
+        facetIndex = { ids: data.ids, total: data.total, bitmaps };
+    } catch (error) {
+        console.warn('Facet index not available, filtering items:', error);
+    }
+}
+
+function setSourceItems(items) {
+    allItems = items;
+    itemsById = new Map(items.map(item => [item.id, item]));
+}
+
+function decodeBitmap(base64) {
+    const binary = atob(base64);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return new Uint32Array(bytes.buffer);
+}
+
+function popcount(bitmap) {
+    let count = 0;
+    for (let i = 0; i < bitmap.length; i++) {
+        let x = bitmap[i];
+        x = x - ((x >>> 1) & 0x55555555);
+        x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+        count += (((x + (x >>> 4)) & 0x0F0F0F0F) * 0x01010101) >>> 24;
+    }
+    return count;
+}
+
+function andBitmaps(a, b) {
+    if (a === null) return b;
+    const result = new Uint32Array(a.length);
+    for (let i = 0; i < a.length; i++) result[i] = a[i] & b[i];
+    return result;
+}
+
+function facetBitmap(facet, value) {
+    return facetIndex.bitmaps[facet][value] || new Uint32Array((facetIndex.total + 31) >>> 5);
+}
+
+// 現在のフィルターの AND（except のファセットは除く）。null は「全件」
+function activeBitmap(except) {
+    let bitmap = null;
+    if (except !== 'gender' && currentGender !== 'ALL') bitmap = andBitmaps(bitmap, facetBitmap('gender', currentGender));
+    if (except !== 'taste' && currentTaste) bitmap = andBitmaps(bitmap, facetBitmap('taste', currentTaste));
+    if (except !== 'type' && currentType) bitmap = andBitmaps(bitmap, facetBitmap('type', currentType));
+    return bitmap;
+}
+
+// ビットマップの立っているアイテムを表示順（種別 → 新しい順）で返す
+function itemsFromBitmap(bitmap, matchSearch) {
+    const result = [];
+    const push = ordinal => {
+        const item = itemsById.get(facetIndex.ids[ordinal]);
+        if (item && matchSearch(item)) result.push(item);
+    };
+    if (bitmap === null) {
+        for (let ordinal = 0; ordinal < facetIndex.total; ordinal++) push(ordinal);
+        return result;
+    }
+    for (let word = 0; word < bitmap.length; word++) {
+        let bits = bitmap[word];
+        while (bits) {
+            const low = bits & -bits;
+            push((word << 5) + (31 - Math.clz32(low)));
+            bits ^= low;
+        }
+    }
+    return result;
+}
+
+// フィルターボタンに「他のフィルターと組み合わせた場合の件数」を表示する
+function updateFacetCounts() {
+    if (!facetIndex) return;
+    const facets = [
+        ['gender', '.gender-tab', 'data-gender'],
+        ['taste', '.taste-filter', 'data-taste'],
+        ['type', '.type-filter', 'data-type'],
+    ];
+    for (const [facet, selector, attr] of facets) {
+        const base = activeBitmap(facet);
+        document.querySelectorAll(selector).forEach(btn => {
+            const value = btn.getAttribute(attr);
+            let count;
+            if (facet === 'gender' && value === 'ALL') {
+                count = base === null ? facetIndex.total : popcount(base);
+            } else {
+                count = popcount(andBitmaps(base, facetBitmap(facet, value)));
+            }
+            let badge = btn.querySelector('.facet-count');
+            if (!badge) {
+                badge = document.createElement('span');
+                badge.className = 'facet-count ml-1 opacity-60 font-normal';
+                btn.appendChild(badge);
+            }
+            badge.textContent = `(${count})`;
+        });
+    }
+}
+
+// ========================================
+// 検索（shards/search-index.json の転置インデックス）
+// ========================================
+
+let searchIndex = null;
+let searchIndexPromise = null;
+const decodedPostings = {};  // gram → アイテム番号の昇順配列
+
+// scripts/search_index.py の normalize_search_text と同じ規則
+// （NFKC で幅を揃え、小文字化し、カタカナをひらがなに寄せる）
+function normalizeSearchText(text) {
+    return text.normalize('NFKC').toLowerCase()
+        .replace(/[\u30a1-\u30f6]/g, ch => String.fromCharCode(ch.charCodeAt(0) - 0x60));
+}
+
+function loadSearchIndex() {
+    if (!searchIndexPromise) {
+        const entry = shardManifest && shardManifest.search;
+        searchIndexPromise = !entry ? Promise.resolve(null) : fetch(DATA_BASE + entry.file)
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                // 別の実行で書かれたインデックスは番号がずれるので使わない
+                if (data && data.lastUpdated === shardManifest.lastUpdated) {
+                    searchIndex = data;
+                }
+                return searchIndex;
+            })
+            .catch(error => {
+                console.warn('Search index not available, scanning items:', error);
+                return null;
+            });
+    }
+    return searchIndexPromise;
+}
+
+function getPostings(gram) {
+    if (!decodedPostings[gram]) {
+        const deltas = searchIndex.grams[gram] || [];
+        const list = new Array(deltas.length);
+        let ordinal = 0;
+        for (let i = 0; i < deltas.length; i++) {
+            ordinal += deltas[i];
+            list[i] = ordinal;
+        }
+        decodedPostings[gram] = list;
+    }
+    return decodedPostings[gram];
+}
+
+function intersectSorted(a, b) {
+    const result = [];
+    let i = 0, j = 0;
+    while (i < a.length && j < b.length) {
+        if (a[i] === b[j]) { result.push(a[i]); i++; j++; }
+        else if (a[i] < b[j]) i++;
+        else j++;
+    }
+    return result;
+}
+
+function getItemSearchText(item) {
+    if (item._searchText === undefined) {
+        item._searchText = normalizeSearchText(`${item.name || ''} ${item.shopName || ''}`);
+    }
+    return item._searchText;
+}
+
+/**
+ * 検索クエリに一致するかを判定する関数を返す。
+ * インデックスがあれば n-gram のポスティングリストの積集合で候補の id を求め、
+ * 候補だけ部分一致を確認する。無ければ全件の部分一致で判定する。
+ */
+function buildSearchMatcher(query) {
+    const tokens = normalizeSearchText(query).split(/\s+/).filter(Boolean);
+    if (tokens.length === 0) return () => true;
+
+    const matchesText = item => {
+        const text = getItemSearchText(item);
+        return tokens.every(token => text.includes(token));
+    };
+    if (!searchIndex) return matchesText;
+
+    let candidates = null;
+    for (const token of tokens) {
+        // search_index.py と同じくコードポイント単位で切る（絵文字などのサロゲートペアを分けない）
+        const chars = Array.from(token);
+        const grams = chars.length === 1
+            ? chars
+            : Array.from({ length: chars.length - 1 }, (_, i) => chars[i] + chars[i + 1]);
+        for (const gram of grams) {
+            const postings = getPostings(gram);
+            candidates = candidates === null ? postings : intersectSorted(candidates, postings);
+            if (candidates.length === 0) return () => false;
+        }
+    }
+    const candidateIds = new Set(candidates.map(ordinal => searchIndex.ids[ordinal]));
+    return item => candidateIds.has(item.id) && matchesText(item);
+}
+
 function getFilteredItems() {
+    const matchSearch = buildSearchMatcher(searchQuery);
+    if (facetIndex) {
+        return itemsFromBitmap(activeBitmap(null), matchSearch);
+    }
     return allItems.filter(item => {
         // Gender Filter (Category) - ARRAY CHECK
         // Logic: 
@@ -152,17 +492,15 @@ function getFilteredItems() {
 
         const matchTaste = !currentTaste || (item.taste && item.taste.includes(currentTaste));
         const matchType = !currentType || item.type === currentType;
-        const matchSearch = !searchQuery ||
-            item.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-            item.shopName.toLowerCase().includes(searchQuery.toLowerCase());
 
-        return matchGender && matchTaste && matchType && matchSearch;
+        return matchGender && matchTaste && matchType && matchSearch(item);
     });
 }
 
 function renderItems(container) {
     let filtered = getFilteredItems();
     updateCount(filtered.length);
+    updateFacetCounts();
 
     if (filtered.length === 0) {
         container.innerHTML = `
@@ -175,12 +513,15 @@ function renderItems(container) {
     }
 
     // Sort Logic: Category -> Date (Newest)
-    filtered.sort((a, b) => {
-        if (a.type < b.type) return -1;
-        if (a.type > b.type) return 1;
-        // Same category, sort by date desc
-        return new Date(b.fetchedAt) - new Date(a.fetchedAt);
-    });
+    // （ファセットのビット順は最初からこの順なので、その場合は並べ替え不要）
+    if (!facetIndex) {
+        filtered.sort((a, b) => {
+            if (a.type < b.type) return -1;
+            if (a.type > b.type) return 1;
+            // Same category, sort by date desc
+            return new Date(b.fetchedAt) - new Date(a.fetchedAt);
+        });
+    }
 
     container.innerHTML = filtered.map(item => createItemCard(item)).join('');
 }
@@ -258,7 +599,7 @@ function initGenderFilters(container) {
             btn.classList.add('active', 'bg-[#333333]', 'text-white');
 
             currentGender = btn.getAttribute('data-gender');
-            renderItems(container);
+            refreshItems(container);
         });
     });
 }
@@ -294,7 +635,7 @@ function initTypeFilters(container) {
                 btns.forEach(b => b.classList.remove('text-black', 'underline', 'font-bold'));
                 btn.classList.add('text-black', 'underline', 'font-bold');
             }
-            renderItems(container);
+            refreshItems(container);
         });
     });
 }
@@ -302,9 +643,15 @@ function initTypeFilters(container) {
 function initSearchBar(container) {
     const searchInput = document.getElementById('item-search');
     if (searchInput) {
+        // インデックスは最初に検索欄を使う時に取得する
+        searchInput.addEventListener('focus', () => loadSearchIndex(), { once: true });
         searchInput.addEventListener('input', (e) => {
             searchQuery = e.target.value;
-            renderItems(container);
+            if (searchIndexPromise && !searchIndex) {
+                searchIndexPromise.then(() => renderItems(container));
+            } else {
+                renderItems(container);
+            }
         });
     }
 }
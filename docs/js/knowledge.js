@@ -9,7 +9,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     async function init() {
         try {
-            const response = await fetch(DATA_URL);
+            const response = await fetch(await resolveDataUrl('knowledge', DATA_URL));
             if (!response.ok) throw new Error('Failed to fetch knowledge data');
             
             allArticles = await response.json();
@@ -1,6 +1,7 @@
 /* Trend Page Logic */
 document.addEventListener('DOMContentLoaded', () => {
-    fetch('../data/trends.json')
+    resolveDataUrl('trends', '../data/trends.json')
+        .then(url => fetch(url))
         .then(response => {
             if (!response.ok) throw new Error("Trends not found");
             return response.json();
@@ -13,7 +13,7 @@ const filterContainer = document.getElementById('filter-container'); // Tabs
 
 async function init() {
     try {
-        const response = await fetch('../data/worlds.json');
+        const response = await fetch(await resolveDataUrl('worlds', '../data/worlds.json'));
         if (!response.ok) throw new Error('Failed to fetch worlds data');
 
         allWorlds = await response.json();
@@ -4,13 +4,30 @@
 OpenAI APIキー不要。
 """
 
+import hashlib
+import json
+import os
 import re
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
+from typing import Optional
+
+from run_report import timed
+from tag_cache import TagCache
 
 logger = logging.getLogger(__name__)
 
+# これ未満のアイテム数ではプロセスプールを使わない（起動コストの方が大きい）
+PARALLEL_THRESHOLD = 5000
+# プロセスプールに渡す1チャンクあたりのアイテム数
+CHUNK_SIZE = 1000
+
 # === タグ定義 ===
 
+# 対象（category）の値。"ALL" のアイテムは全ての対象に表示される
+GENDERS = ("WOMEN'S", "MEN'S", "KIDS'", "XENO'S")
+
 # 対象カテゴリ（メンズ/レディース/キッズ）
 CATEGORY_RULES = {
     "mens": {
@@ -138,16 +155,115 @@ TYPE_RULES = {
     ],
 }
 
+# tag_item() の判定ロジックを変えたら上げる（ルール辞書の変更は自動で反映される）
+TAGGER_LOGIC_VERSION = "1"
+
+# タグ付けルールセットのバージョン。タグキャッシュ（tag_cache.py）のキーに使う
+RULESET_VERSION = hashlib.sha256(
+    json.dumps(
+        {"logic": TAGGER_LOGIC_VERSION, "category": CATEGORY_RULES, "taste": TASTE_RULES},
+        ensure_ascii=False,
+        sort_keys=True,
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+
+
+# 正規表現のメタ文字（これを含まないパターンはリテラルとして扱える）
+_REGEX_META = frozenset(".^$*+?{}[]\\|()")
+
+# IGNORECASE で ASCII 文字と等価になるのに str.lower() では揃わない文字を寄せる
+# （ı→i, ſ→s, İ.lower() が生む結合ドットを除去）。候補の絞り込みにだけ使う。
+_FOLD_TABLE = str.maketrans({"\u0131": "i", "\u017f": "s", "\u0307": None})
+
+
+def _fold(text: str) -> str:
+    text = text.lower()
+    # translate は遅いので、対象文字がある時だけ呼ぶ
+    if "\u0131" in text or "\u017f" in text or "\u0307" in text:
+        text = text.translate(_FOLD_TABLE)
+    return text
+
+
+def _required_literal(pattern: str) -> str:
+    """パターンがマッチするなら必ずテキストに含まれる先頭リテラルを返す（無ければ空文字）。"""
+    if "|" in pattern or "\\" in pattern:
+        return ""
+    for i, ch in enumerate(pattern):
+        if ch in _REGEX_META:
+            break
+    else:
+        return pattern
+    prefix = pattern[:i]
+    if pattern[i] in "?*{":
+        # 直後の量指定子で最後の1文字は省略されうる
+        prefix = prefix[:-1]
+    return prefix
+
+
+class _RuleMatcher:
+    """
+    ルールセットを1度だけ前処理したマッチャ。
+
+    アイテムごとにパターン数だけ re.search するのをやめ、
+    - 大文字小文字の区別がないリテラル（日本語キーワード）は部分文字列検索で確定
+    - 英字を含むリテラルと正規表現パターンは、小文字化したテキストに必須部分が
+      含まれる場合だけ、コンパイル済みの正規表現で確認
+    する。結果はパターンごとに re.search(pattern, text, re.IGNORECASE) していた頃と同一。
+    """
+
+    def __init__(self, rules: dict[str, list[str]]):
+        self.entries = []
+        for tag, patterns in rules.items():
+            exact = []   # 含まれていれば確定するリテラル
+            checks = []  # (絞り込み用リテラル, 確認用正規表現)
+            for pattern in patterns:
+                literal = _required_literal(pattern)
+                if literal and literal == pattern and literal.lower() == literal.upper():
+                    exact.append(literal)
+                else:
+                    checks.append((_fold(literal), re.compile(pattern, re.IGNORECASE)))
+            self.entries.append((tag, tuple(exact), tuple(checks)))
+
+    def match(self, text: str, folded: Optional[str] = None) -> list[str]:
+        """テキストにマッチするタグをルール定義順のリストで返す。"""
+        if folded is None:
+            folded = _fold(text)
+        matched = []
+        for tag, exact, checks in self.entries:
+            for literal in exact:
+                if literal in text:
+                    matched.append(tag)
+                    break
+            else:
+                for literal, regex in checks:
+                    if literal in folded and regex.search(text):
+                        matched.append(tag)
+                        break
+        return matched
+
+
+_MATCHERS: dict[int, tuple[dict, _RuleMatcher]] = {}
+
+
+def _get_matcher(rules: dict[str, list[str]]) -> _RuleMatcher:
+    """ルール辞書ごとのマッチャを1度だけ作って使い回す。"""
+    cached = _MATCHERS.get(id(rules))
+    if cached is None or cached[0] is not rules:
+        cached = (rules, _RuleMatcher(rules))
+        _MATCHERS[id(rules)] = cached
+    return cached[1]
+
+
+# カテゴリ自動判定用（keywords と avatars をまとめて1タグとして扱う）
+_CATEGORY_MATCHER = _RuleMatcher({
+    cat: rules["keywords"] + rules["avatars"] for cat, rules in CATEGORY_RULES.items()
+})
+
 
 def _match_rules(text: str, rules: dict[str, list[str]]) -> list[str]:
     """テキストにキーワードがマッチするタグをリストで返す。"""
-    matched = []
-    for tag, patterns in rules.items():
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                matched.append(tag)
-                break
-    return matched
+    return _get_matcher(rules).match(text)
 
 
 def tag_item(item: dict) -> dict:
@@ -162,6 +278,7 @@ def tag_item(item: dict) -> dict:
     """
     # 検索対象テキスト
     search_text = f"{item.get('name', '')} {item.get('description', '')}"
+    folded_text = _fold(search_text)
 
     # === 1. Category (Target Gender - CSV Col C) ===
     # Manual Override: Use exact value, split by comma if multiple
@@ -186,15 +303,12 @@ def tag_item(item: dict) -> dict:
                  categories.append(g) # Keep other raw values just in case
     else:
         # Auto Detect (Fallback) - Default to WOMEN'S if nothing found
+        # マッチしたカテゴリのうちルール定義順で最後のものを採用
         found_cat = "WOMEN'S"
-        for cat, rules in CATEGORY_RULES.items():
-            all_patterns = rules["keywords"] + rules["avatars"]
-            for pattern in all_patterns:
-                if re.search(pattern, search_text, re.IGNORECASE):
-                    if cat == "mens": found_cat = "MEN'S"
-                    elif cat == "kids": found_cat = "KIDS'"
-                    else: found_cat = "WOMEN'S"
-                    break
+        for cat in _CATEGORY_MATCHER.match(search_text, folded_text):
+            if cat == "mens": found_cat = "MEN'S"
+            elif cat == "kids": found_cat = "KIDS'"
+            else: found_cat = "WOMEN'S"
         categories.append(found_cat)
     
     # Ensure unique
@@ -211,7 +325,7 @@ def tag_item(item: dict) -> dict:
     item_type = display_type.upper()
 
     # === 3. Taste (Tags) ===
-    tastes = _match_rules(search_text, TASTE_RULES)
+    tastes = _get_matcher(TASTE_RULES).match(search_text, folded_text)
     if not tastes:
         tastes = ["casual"]
 
@@ -228,38 +342,171 @@ def tag_item(item: dict) -> dict:
     return item
 
 
-def tag_all_items(items: list[dict]) -> list[dict]:
-    """全アイテムにタグを付与する。"""
-    tagged = []
-    for item in items:
-        tagged_item = tag_item(item)
-        tagged.append(tagged_item)
-        logger.debug(
-            f"  {tagged_item['name'][:30]}... → "
-            f"cat:{tagged_item['category']} "
-            f"taste:{tagged_item['taste']} "
-            f"type:{tagged_item['type']}"
-        )
-
-    # 統計
+def _count_tags(items: list[dict]) -> dict[str, dict[str, int]]:
+    """タグ付け済みアイテムのカテゴリ・テイスト・種別ごとの件数を数える。"""
     cat_stats = {}
     taste_stats = {}
     type_stats = {}
-    for item in tagged:
+    for item in items:
         # item["category"] is now a list, but we want to count individual occurrences
         cats = item["category"] if isinstance(item["category"], list) else [item["category"]]
         for c in cats:
             cat_stats[c] = cat_stats.get(c, 0) + 1
-            
+
         for t in item["taste"]:
             taste_stats[t] = taste_stats.get(t, 0) + 1
         type_stats[item["type"]] = type_stats.get(item["type"], 0) + 1
+    return {"category": cat_stats, "taste": taste_stats, "type": type_stats}
+
+
+def merge_tag_stats(total: dict[str, dict[str, int]], stats: dict[str, dict[str, int]]) -> None:
+    """チャンクごとの件数を total に足し込む（キーの出現順は先勝ち）。"""
+    for kind, counts in stats.items():
+        merged = total.setdefault(kind, {})
+        for key, count in counts.items():
+            merged[key] = merged.get(key, 0) + count
 
-    logger.info(f"タグ付け完了: {len(tagged)} アイテム")
-    logger.info(f"  カテゴリ: {cat_stats}")
-    logger.info(f"  テイスト: {taste_stats}")
-    logger.info(f"  種別: {type_stats}")
 
+def _tag_chunk(chunk: list[dict]) -> tuple[list[dict], dict[str, dict[str, int]]]:
+    """チャンク内の全アイテムをタグ付けし、チャンク分の統計と一緒に返す（ワーカープロセス用）。"""
+    tagged = []
+    for item in chunk:
+        tagged_item = tag_item(item)
+        tagged.append(tagged_item)
+        logger.debug(
+            f"  {tagged_item['name'][:30]}... → "
+            f"cat:{tagged_item['category']} "
+            f"taste:{tagged_item['taste']} "
+            f"type:{tagged_item['type']}"
+        )
+    return tagged, _count_tags(tagged)
+
+
+@timed("tag_items")
+def tag_items(
+    items: list[dict],
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    parallel_threshold: int = PARALLEL_THRESHOLD,
+    cache: Optional[TagCache] = None,
+    pool: Optional[Executor] = None,
+) -> dict[str, dict[str, int]]:
+    """
+    アイテムにタグを付与し（入力の dict を更新）、カテゴリ・テイスト・種別の件数を返す。
+
+    parallel_threshold 件以上かつワーカーが2以上なら、chunk_size 件ずつに分けて
+    プロセスプールで並列にタグ付けする。それ未満はプロセス起動のコストの方が
+    大きいので、これまで通り同じプロセス内で処理する。
+    どちらの場合も入力の順序を保つ。
+
+    バッチごとに何度も呼ぶ場合は tag_pool() のプールを pool に渡す。プールは呼び出し間で
+    共有され起動コストは1回だけなので、タグ付けが必要なアイテムが2チャンク以上あれば
+    parallel_threshold・workers によらずそのプールを使う。
+
+    cache を渡すと、入力（name / description / manual_*）とルールセットが
+    前回と同じアイテムはタグ付けせずにキャッシュの結果をコピーする。
+
+    Args:
+        items: Scraped item dicts
+        workers: プロセス数（デフォルト: CPU数）
+        chunk_size: 1タスクあたりのアイテム数
+        parallel_threshold: 並列化する最小アイテム数
+        cache: タグキャッシュ（None ならキャッシュしない）
+        pool: 共有のプロセスプール（tag_pool()）
+    """
+    workers = workers or os.cpu_count() or 1
+    stats: dict[str, dict[str, int]] = {}
+
+    # キャッシュヒットは結果をコピーするだけ。ミスしたものだけタグ付けする
+    pending = items
+    pending_keys = []
+    if cache is not None:
+        pending = []
+        hits = []
+        for item in items:
+            key = cache.key(item)
+            entry = cache.get(key)
+            if entry is None:
+                pending.append(item)
+                pending_keys.append(key)
+                continue
+            for field, value in entry.items():
+                item[field] = list(value) if isinstance(value, list) else value
+            item.pop("manual_gender", None)
+            item.pop("manual_item_type", None)
+            hits.append(item)
+        merge_tag_stats(stats, _count_tags(hits))
+
+    if pool is not None:
+        parallel = len(pending) > chunk_size
+    else:
+        parallel = workers >= 2 and len(pending) >= parallel_threshold
+    if not parallel:
+        merge_tag_stats(stats, _tag_chunk(pending)[1])
+    else:
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        if pool is not None:
+            _tag_chunks_in_pool(pool, chunks, stats)
+            logger.info(f"並列タグ付け: {len(chunks)} チャンク（共有プール）")
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                _tag_chunks_in_pool(executor, chunks, stats)
+            logger.info(f"並列タグ付け: {len(chunks)} チャンク / {min(workers, len(chunks))} プロセス")
+
+    if cache is not None:
+        for key, item in zip(pending_keys, pending):
+            cache.put(key, item)
+
+    return stats
+
+
+def _tag_chunks_in_pool(executor: Executor, chunks: list[list[dict]], stats: dict[str, dict[str, int]]) -> None:
+    # map は投入順に結果を返すので、チャンクをつなげれば入力順になる
+    for chunk, (tagged_chunk, chunk_stats) in zip(chunks, executor.map(_tag_chunk, chunks)):
+        for item, tagged_item in zip(chunk, tagged_chunk):
+            # ワーカーはコピーを更新しているので、結果を元の dict に反映する
+            item.update(tagged_item)
+            item.pop("manual_gender", None)
+            item.pop("manual_item_type", None)
+        merge_tag_stats(stats, chunk_stats)
+
+
+def tag_pool(workers: Optional[int] = None) -> AbstractContextManager[Optional[ProcessPoolExecutor]]:
+    """
+    tag_items(pool=...) に渡す、複数回の呼び出しで共有するプロセスプール。
+
+    ワーカーが1なら None（同じプロセス内で処理する）。プロセスは最初に使うときに起動するので、
+    一度も並列化しなければ起動コストはかからない。
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 2:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def log_tag_stats(count: int, stats: dict[str, dict[str, int]]) -> None:
+    logger.info(f"タグ付け完了: {count} アイテム")
+    logger.info(f"  カテゴリ: {stats.get('category', {})}")
+    logger.info(f"  テイスト: {stats.get('taste', {})}")
+    logger.info(f"  種別: {stats.get('type', {})}")
+
+
+@timed("tag_all_items")
+def tag_all_items(
+    items: list[dict],
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    parallel_threshold: int = PARALLEL_THRESHOLD,
+    cache: Optional[TagCache] = None,
+) -> list[dict]:
+    """
+    全アイテムにタグを付与したコピーを返す（引数は tag_items と同じ。入力は変更しない）。
+
+    入力をそのまま更新してよい場合は tag_items を使う。
+    """
+    tagged = [dict(item) for item in items]
+    stats = tag_items(tagged, workers, chunk_size, parallel_threshold, cache)
+    log_tag_stats(len(tagged), stats)
     return tagged
 
 
@@ -15,14 +15,42 @@ import re
 import time
 import random
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional
+from html import unescape
+from html.parser import HTMLParser
+from typing import Optional, Union
+from urllib.parse import urlparse
+
+from throttle import (
+    RETRY_STATUSES,
+    AdaptiveRateLimiter,
+    HostRateLimiter,
+    backoff_delay,
+    retry_after_seconds,
+)
+from http_cache import CachedResponse, get_default_cache
+from http_client import get_default_client
+from run_report import get_report, timed
+from refresh_planner import FRESH_FOR, MAX_REVALIDATIONS, plan_refresh
+from scrape_journal import ScrapeJournal
 
 logger = logging.getLogger(__name__)
 
 # === マナー設定 ===
 USER_AGENT = "VRC-LIFE Portal Bot"
-# REQUEST_DELAY will be randomized
+# 同一ホストへのリクエスト間隔（秒）。全ワーカー合計で守られる。
+REQUEST_INTERVAL = 3.0
+# 429 / 503 が続いたときに広げる間隔の上限（秒）
+MAX_REQUEST_INTERVAL = 60.0
+# 1ページの取得を試みる回数（429 / 5xx / 接続エラーで再試行する）
+MAX_ATTEMPTS = 4
+# 再試行までの待機の基準（秒）。attempt ごとに倍、実際の待機はその範囲の乱数
+RETRY_BASE_DELAY = 5.0
+# 同時に処理するリクエスト数（待機中のワーカーを含む）
+MAX_WORKERS = 4
+# parse_item_detail_page の出力を変えたら上げる（HTTPキャッシュ内の解析結果を無効化）
+DETAIL_PARSER_VERSION = "1"
 
 HEADERS = {
     "User-Agent": USER_AGENT,
@@ -31,20 +59,71 @@ HEADERS = {
 }
 
 
-def fetch_page(url: str, session: requests.Session) -> Optional[BeautifulSoup]:
-    """1ページ取得。マナー設定に従い待機時間を挿入。"""
-    try:
-        logger.info(f"Fetching: {url}")
-        response = session.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        
-        # Random sleep 1-3 seconds
-        time.sleep(1 + 2 * __import__("random").random())
-        
-        return BeautifulSoup(response.text, "html.parser")
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch {url}: {e}")
-        return None
+def _booth_host_key(url: str) -> str:
+    """*.booth.pm（ショップサブドメイン）は booth.pm としてまとめてレート制御する。"""
+    host = urlparse(url).netloc.lower()
+    if host == "booth.pm" or host.endswith(".booth.pm"):
+        return "booth.pm"
+    return host
+
+
+# プロセス全体で共有するレートリミッタ（スレッド間で間隔を守る）。
+# 429 / 503 を受けると間隔を広げ、正常な応答が続けば REQUEST_INTERVAL まで戻す
+BOOTH_LIMITER = AdaptiveRateLimiter(
+    interval=REQUEST_INTERVAL,
+    max_interval=MAX_REQUEST_INTERVAL,
+    key_func=_booth_host_key,
+)
+
+
+@timed("fetch_html")
+def fetch_html(
+    url: str,
+    session: requests.Session,
+    limiter: Optional[HostRateLimiter] = None,
+) -> Optional[CachedResponse]:
+    """
+    1ページ取得（条件付きGET）。マナー設定に従い、ホスト単位の間隔が空くまで待機してから送信する。
+
+    429 / 5xx / 接続エラー・タイムアウトは MAX_ATTEMPTS 回まで、ジッター付きの
+    指数バックオフで再試行する。応答は limiter に伝え、429 / 503 なら間隔が広がる。
+    取得できなければ None。
+    """
+    limiter = limiter or BOOTH_LIMITER
+    cache = get_default_cache()
+    # replay では通信しないので、待機も再試行もしない
+    attempts = 1 if cache.offline else MAX_ATTEMPTS
+    error = None
+    for attempt in range(attempts):
+        try:
+            if not cache.offline:
+                waited = limiter.acquire(url)
+                get_report().add_time("rate_limit_wait", waited)
+            logger.info(f"Fetching: {url}")
+            response = cache.get(url, session=session, headers=HEADERS, timeout=30)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        except requests.RequestException as e:
+            logger.error(f"Failed to fetch {url}: {e}")
+            return None
+        else:
+            if not cache.offline:
+                limiter.record(url, response.status_code, retry_after_seconds(response.headers))
+            if response.ok:
+                return response
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+        if attempt + 1 < attempts:
+            delay = backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=MAX_REQUEST_INTERVAL)
+            logger.warning(f"  {error}: {delay:.1f}s 後に再試行します ({attempt + 1}/{attempts - 1}) {url}")
+            get_report().count("fetch_retries")
+            time.sleep(delay)
+
+    logger.error(f"Failed to fetch {url}: {error}")
+    get_report().count("fetch_failures")
+    return None
 
 
 import csv
@@ -60,7 +139,7 @@ def fetch_csv_urls(csv_url: str) -> list[dict]:
     C: Type (WOMEN'S / MEN'S / KIDS' / XENO'S / ALL) -> Maps to system `category`
     """
     try:
-        response = requests.get(csv_url)
+        response = get_default_cache().get(csv_url, timeout=30)
         response.raise_for_status()
         
         # CSV parse
@@ -101,21 +180,273 @@ def parse_item(item_element: Tag) -> Optional[dict]:
     # Legacy function kept for interface compatibility if needed, but not used in CSV mode
     return None
 
-def parse_item_detail_page(soup: BeautifulSoup, booth_url: str) -> Optional[dict]:
-    """個別商品ページのHTMLから情報を抽出する (Attribute-based)"""
+# === 高速抽出 (ツリーを作らない) ===
+# BeautifulSoup(html.parser) が空要素として即座に閉じるタグ
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer",
+})
+# get_text() の対象外になる文字列を持つタグ
+_NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+_DESC_CLASSES = frozenset({"js-market-item-detail-description", "description"})
+_ADULT_CLASSES = frozenset({"badge-adult", "is-adult", "r18-badge"})
+_DESC_LIMIT = 500
+_FEED_CHUNK = 16 * 1024
+
+# soup.get_text() 相当の文字列を正規表現だけで作るためのパターン
+_HIDDEN_BLOCK_RE = re.compile(
+    r"<!--.*?(?:-->|--!>|\Z)"
+    r"|<(script|style|template|rt|rp)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>.*?(?:</\1\s*>|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+_MARKUP_RE = re.compile(
+    r"<!\[CDATA\[(.*?)\]\]>"
+    r"|<(?:[a-zA-Z/](?:[^>\"']|\"[^\"]*\"|'[^']*')*|[!?][^>]*)>",
+    re.DOTALL,
+)
+
+
+def _page_text_contains(html_text: str, needle: str) -> bool:
+    """soup.get_text() に needle が含まれるかを、ツリーを作らずに判定する。"""
+    text = _MARKUP_RE.sub(lambda m: m.group(1) or "", _HIDDEN_BLOCK_RE.sub("", html_text))
+    return needle in unescape(text)
+
+
+class _DetailPageExtractor(HTMLParser):
+    """parse_item_detail_page に必要な要素だけを拾うイベント駆動パーサ。
+
+    タグの入れ子はスタックで追うだけで DOM は作らない。
+    必要な情報が揃った時点で done になり、残りの入力は読まない。
+    """
+
+    def __init__(self, need_adult_badge: bool, og_possible: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.product_attrs: Optional[dict] = None
+        self.og_image: Optional[str] = None
+        self.img_in_wrapper: Optional[str] = None   # .market-item-detail-item-image img
+        self.img_with_class: Optional[str] = None   # img.market-item-detail-item-image
+        self.desc_parts: Optional[list[str]] = None
+        self.has_adult_badge = False
+        self._need_adult_badge = need_adult_badge
+        self._og_possible = og_possible
+        self._stack: list[tuple[str, bool, bool, bool]] = []  # (tag, in_wrapper, in_desc, hidden)
+        self._text: list[str] = []
+        self._desc_len = 0
+        self._desc_closed = False
+        self.done = False
+
+    # --- text handling (bs4 同様、タグ間の連続テキストを1文字列にまとめる) ---
+
+    def _flush_text(self) -> None:
+        if not self._text:
+            return
+        data = "".join(self._text)
+        self._text = []
+        if self._desc_closed or self.desc_parts is None or not self._stack:
+            return
+        _, _, in_desc, hidden = self._stack[-1]
+        if not in_desc or hidden or self._desc_len > _DESC_LIMIT:
+            return
+        data = data.strip()
+        if data:
+            self.desc_parts.append(data)
+            self._desc_len += len(data) + 1
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def unknown_decl(self, data):
+        # CDATA は前後のテキストと結合されない独立した文字列になる
+        self._flush_text()
+        if data.upper().startswith("CDATA["):
+            self._text.append(data[6:])
+            self._flush_text()
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    # --- tags ---
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        attr_map = {k: ("" if v is None else v) for k, v in attrs}
+        classes = set(attr_map.get("class", "").split())
+
+        if self.product_attrs is None and "data-product-id" in attr_map:
+            self.product_attrs = attr_map
+        if tag == "meta" and self.og_image is None and attr_map.get("property") == "og:image":
+            self.og_image = attr_map.get("content", "")
+        if classes & _ADULT_CLASSES:
+            self.has_adult_badge = True
+
+        parent_wrapper, parent_desc, parent_hidden = False, False, False
+        if self._stack:
+            _, parent_wrapper, parent_desc, parent_hidden = self._stack[-1]
+
+        if tag == "img":
+            if parent_wrapper and self.img_in_wrapper is None:
+                self.img_in_wrapper = attr_map.get("src", "")
+            if "market-item-detail-item-image" in classes and self.img_with_class is None:
+                self.img_with_class = attr_map.get("src", "")
+
+        in_desc = parent_desc
+        if self.desc_parts is None and classes & _DESC_CLASSES:
+            self.desc_parts = []
+            in_desc = True
+
+        if tag not in _VOID_TAGS:
+            self._stack.append((
+                tag,
+                parent_wrapper or "market-item-detail-item-image" in classes,
+                in_desc,
+                parent_hidden or tag in _NON_TEXT_TAGS,
+            ))
+        self._update_done()
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # 対応する開始タグまで閉じる。無ければ無視（bs4 の _popToTag と同じ）
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                was_desc = self._stack[i][2]
+                del self._stack[i:]
+                if was_desc and self.desc_parts is not None and not (self._stack and self._stack[-1][2]):
+                    self._desc_closed = True
+                break
+        self._update_done()
+
+    def _update_done(self) -> None:
+        if self.product_attrs is None:
+            return
+        if not (self._desc_closed or self._desc_len > _DESC_LIMIT):
+            return
+        if not self.og_image:
+            # og:image が後から現れうる間は代替画像では確定できない
+            if self.img_in_wrapper is None or (self.og_image is None and self._og_possible):
+                return
+        if self._need_adult_badge and not self.has_adult_badge:
+            return
+        self.done = True
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+    @property
+    def description(self) -> str:
+        if self.desc_parts is None:
+            return ""
+        return "\n".join(self.desc_parts)[:_DESC_LIMIT]
+
+
+def _extract_detail_fields(html_text: str) -> Optional[dict]:
+    """HTML文字列から必要な値だけを抽出する（DOMを作らない高速パス）。"""
+    # 成人向けバッジのクラス名や og:image がどこにも無ければ、探すために最後まで読む必要はない
+    need_adult_badge = any(c in html_text for c in _ADULT_CLASSES)
+    extractor = _DetailPageExtractor(need_adult_badge, og_possible="og:image" in html_text)
+    for start in range(0, len(html_text), _FEED_CHUNK):
+        extractor.feed(html_text[start:start + _FEED_CHUNK])
+        if extractor.done:
+            break
+    else:
+        extractor.close()
+
+    attrs = extractor.product_attrs
+    if attrs is None:
+        return None
+
+    thumbnail_url = extractor.og_image or ""
+    if not thumbnail_url:
+        if extractor.img_in_wrapper is not None:
+            thumbnail_url = extractor.img_in_wrapper
+        elif extractor.img_with_class is not None:
+            thumbnail_url = extractor.img_with_class
+
+    return {
+        "item_id": attrs.get("data-product-id"),
+        "name": attrs.get("data-product-name"),
+        "price_str": attrs.get("data-product-price"),
+        "shop_name": attrs.get("data-product-brand"),
+        "thumbnail_url": thumbnail_url,
+        "description": extractor.description,
+        "is_r18": extractor.has_adult_badge or _page_text_contains(html_text, "R-18"),
+    }
+
+
+def _extract_detail_fields_soup(soup: BeautifulSoup) -> Optional[dict]:
+    """BeautifulSoup から必要な値を抽出する（従来のセレクタ方式）。"""
+    # 1. Basic Info from Attributes (Reliable)
+    # Strategy: find ANY element with data-product-id
+    product_el = soup.select_one("[data-product-id]")
+    if not product_el:
+        return None
+
+    # Thumbnail
+    # meta prop="og:image" is reliable for detail pages
+    thumbnail_url = ""
+    og_img = soup.select_one('meta[property="og:image"]')
+    if og_img:
+        thumbnail_url = og_img.get("content", "")
+
+    # Fallback thumbnail
+    if not thumbnail_url:
+        img_el = soup.select_one(".market-item-detail-item-image img")
+        img_el_2 = soup.select_one("img.market-item-detail-item-image") # possible variation
+        if img_el:
+            thumbnail_url = img_el.get("src", "")
+        elif img_el_2:
+            thumbnail_url = img_el_2.get("src", "")
+
+    # Description
+    description = ""
+    desc_el = soup.select_one(".js-market-item-detail-description, .description")
+    if desc_el:
+        description = desc_el.get_text(separator="\n", strip=True)[:_DESC_LIMIT]
+
+    # R18 Check
+    is_r18 = False
+    body_text = soup.get_text()
+    if "R-18" in body_text or soup.select_one(".badge-adult, .is-adult, .r18-badge"):
+        is_r18 = True
+
+    return {
+        "item_id": product_el.get("data-product-id"),
+        "name": product_el.get("data-product-name"),
+        "price_str": product_el.get("data-product-price"),
+        "shop_name": product_el.get("data-product-brand"),
+        "thumbnail_url": thumbnail_url,
+        "description": description,
+        "is_r18": is_r18,
+    }
+
+
+@timed("parse_item_detail_page")
+def parse_item_detail_page(page: Union[BeautifulSoup, str], booth_url: str) -> Optional[dict]:
+    """個別商品ページのHTMLから情報を抽出する (Attribute-based)
+
+    HTML文字列を渡すと DOM を作らない高速パス、BeautifulSoup を渡すと
+    従来のセレクタ方式で抽出する。どちらも同じ dict を返す。
+    """
     try:
-        # 1. Basic Info from Attributes (Reliable)
-        # Strategy: find ANY element with data-product-id
-        product_el = soup.select_one("[data-product-id]")
-        if not product_el:
+        if isinstance(page, str):
+            fields = _extract_detail_fields(page)
+        else:
+            fields = _extract_detail_fields_soup(page)
+        if fields is None:
             logger.warning(f"  [Skip] No data-product-id found in {booth_url}")
             return None
 
-        item_id = product_el.get("data-product-id")
-        name = product_el.get("data-product-name")
-        price_str = product_el.get("data-product-price")
-        shop_name = product_el.get("data-product-brand")
-        
+        item_id = fields["item_id"]
+        name = fields["name"]
+        price_str = fields["price_str"]
+
         # Price
         price = 0
         if price_str:
@@ -124,34 +455,6 @@ def parse_item_detail_page(soup: BeautifulSoup, booth_url: str) -> Optional[dict
             except:
                 pass
 
-        # Thumbnail
-        # meta prop="og:image" is reliable for detail pages
-        thumbnail_url = ""
-        og_img = soup.select_one('meta[property="og:image"]')
-        if og_img:
-            thumbnail_url = og_img.get("content", "")
-        
-        # Fallback thumbnail
-        if not thumbnail_url:
-            img_el = soup.select_one(".market-item-detail-item-image img")
-            img_el_2 = soup.select_one("img.market-item-detail-item-image") # possible variation
-            if img_el:
-                thumbnail_url = img_el.get("src", "")
-            elif img_el_2:
-                thumbnail_url = img_el_2.get("src", "")
-
-        # Description
-        description = ""
-        desc_el = soup.select_one(".js-market-item-detail-description, .description")
-        if desc_el:
-            description = desc_el.get_text(separator="\n", strip=True)[:500]
-
-        # R18 Check
-        is_r18 = False
-        body_text = soup.get_text()
-        if "R-18" in body_text or soup.select_one(".badge-adult, .is-adult, .r18-badge"):
-            is_r18 = True
-
         # Likes (Removed by User Request V5)
         likes = 0
 
@@ -163,12 +466,12 @@ def parse_item_detail_page(soup: BeautifulSoup, booth_url: str) -> Optional[dict
             "id": f"booth-{item_id}", # Add prefix for consistency
             "name": name,
             "price": price,
-            "shopName": shop_name,
+            "shopName": fields["shop_name"],
             "boothUrl": booth_url,
-            "thumbnailUrl": thumbnail_url,
+            "thumbnailUrl": fields["thumbnail_url"],
             "likes": likes,
-            "isR18": is_r18,
-            "description": description,
+            "isR18": fields["is_r18"],
+            "description": fields["description"],
             "fetchedAt": datetime.now(timezone.utc).isoformat(),
         }
 
@@ -180,10 +483,72 @@ def parse_item_detail_page(soup: BeautifulSoup, booth_url: str) -> Optional[dict
 # Deleted fetch_item_detail as we are reverting to search page scraping 
 
 
-def scrape_booth(min_likes: int = 0, fetch_details: bool = False, dry_run: bool = False) -> list[dict]:
+def _scrape_one(item_data: dict, limiter: HostRateLimiter) -> Optional[dict]:
+    """CSVの1行分を取得・解析する（ワーカースレッドで実行）。"""
+    url = item_data["url"]
+    cache = get_default_cache()
+    try:
+        response = fetch_html(url, get_default_client(), limiter)
+        if response is None:
+            return None
+
+        # 304（ページ未変更）なら前回の解析結果を再利用する
+        item = None
+        if response.not_modified:
+            cached = cache.load_parsed(url, DETAIL_PARSER_VERSION)
+            if cached:
+                item = dict(cached, fetchedAt=datetime.now(timezone.utc).isoformat())
+                logger.info(f"  -> Not modified: {url}")
+
+        if item is None:
+            item = parse_item_detail_page(response.text, url)
+            if item:
+                cache.store_parsed(url, DETAIL_PARSER_VERSION, {k: v for k, v in item.items() if k != "fetchedAt"})
+
+        if item:
+            # Add manual tags from CSV
+            item["manual_item_type"] = item_data["manual_item_type"]
+            item["manual_gender"] = item_data["manual_gender"]
+        return item
+    except Exception as e:
+        logger.error(f"Error extracting {url}: {e}")
+        return None
+
+
+def _reuse_existing(existing: dict, item_data: dict) -> dict:
+    """再取得しないアイテムは既存データに最新のCSV手動タグだけ載せ直す。"""
+    item = dict(existing)
+    item["manual_item_type"] = item_data["manual_item_type"]
+    item["manual_gender"] = item_data["manual_gender"]
+    return item
+
+
+@timed("scrape_booth")
+def scrape_booth(
+    min_likes: int = 0,
+    fetch_details: bool = False,
+    dry_run: bool = False,
+    max_workers: int = MAX_WORKERS,
+    existing_by_url: Optional[dict[str, dict]] = None,
+    fresh_for=FRESH_FOR,
+    max_revalidations: Optional[int] = MAX_REVALIDATIONS,
+    journal: Optional[ScrapeJournal] = None,
+    resume: bool = False,
+) -> list[dict]:
     """
     User Request V3: CSV-Based Scraping.
     Fetches URLs from a Google Sheet CSV and scrapes individual pages.
+
+    複数ワーカーで並行取得するが、リクエスト間隔は BOOTH_LIMITER により
+    ホスト単位で REQUEST_INTERVAL 秒以上に保たれる。
+    結果の順序はCSVの順序と同じ。
+
+    existing_by_url（boothUrl → 既存アイテム）を渡すと差分更新になり、
+    refresh_planner.plan_refresh で選ばれたURLだけを取得する。
+    選ばれなかったURLは既存アイテムをそのまま返す。
+
+    journal を渡すと取得できたアイテムを1件ずつ記録する（scrape_journal 参照）。
+    resume=True なら前回の実行のジャーナルにあるURLは取得せず、記録された結果を使う。
     """
     if dry_run:
         logger.info("=== DRY RUN MODE ===")
@@ -192,43 +557,70 @@ def scrape_booth(min_likes: int = 0, fetch_details: bool = False, dry_run: bool
     # CSV URL provided by user
     CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ98u4MEiJ3o8jesqRUMv7hrg8atUwxQoIggjMlRWlHFCeCNDCObcde1cjOVXKVW5BFscQe7Z5zsG2_/pub?output=csv"
     
-    session = requests.Session()
-    session.headers.update(HEADERS)
-
     logger.info(f"Fetching URL list from CSV...")
     target_items = fetch_csv_urls(CSV_URL)
-    logger.info(f"Target Items: {len(target_items)}")
-    
+    logger.info(f"Target Items: {len(target_items)} (workers: {max_workers})")
+
+    if existing_by_url is None:
+        fetch_urls = {d["url"] for d in target_items}
+    else:
+        fetch_urls = plan_refresh(
+            target_items,
+            existing_by_url,
+            fresh_for=fresh_for,
+            max_revalidations=max_revalidations,
+        )
+    done = journal.load() if journal is not None and resume else {}
+    fetch_targets = [d for d in target_items if d["url"] in fetch_urls and d["url"] not in done]
+    if journal is not None:
+        # 再開できるジャーナルが無ければ新しく始める
+        journal.open(resume=bool(done))
+
+    def scrape(item_data: dict) -> Optional[dict]:
+        item = _scrape_one(item_data, BOOTH_LIMITER)
+        if item and journal is not None:
+            # 完了した順に記録する（map の順番待ちで記録が遅れないよう、ワーカー側で）
+            journal.record(item_data["url"], item)
+        return item
+
     all_items = []
-    seen_ids = set() 
-    
-    for i, item_data in enumerate(target_items):
-        url = item_data["url"]
-        try:
-            logger.info(f"[{i+1}/{len(target_items)}] Scraping: {url}")
-            soup = fetch_page(url, session)
-            if not soup:
+    seen_ids = set()
+    fetched = 0
+    resumed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # map は入力順に結果を返すので、重複判定の優先順位は逐次版と変わらない
+        results = executor.map(scrape, fetch_targets)
+        for item_data in target_items:
+            url = item_data["url"]
+            if url in done:
+                resumed += 1
+                item = _reuse_existing(done[url], item_data)
+            elif url in fetch_urls:
+                fetched += 1
+                item = next(results)
+                logger.info(f"[{fetched}/{len(fetch_targets)}] Scraped: {url}")
+            else:
+                item = _reuse_existing(existing_by_url[url], item_data)
+            if not item:
                 continue
-            
-            item = parse_item_detail_page(soup, url)
-            
-            if item:
-                # Add manual tags from CSV
-                item["manual_item_type"] = item_data["manual_item_type"]
-                item["manual_gender"] = item_data["manual_gender"]
-
-                # Check duplication
-                if item["id"] not in seen_ids:
-                    seen_ids.add(item["id"])
-                    all_items.append(item)
+
+            # Check duplication
+            if item["id"] not in seen_ids:
+                seen_ids.add(item["id"])
+                all_items.append(item)
+                if url in fetch_urls:
                     logger.info(f"  -> OK: {item['name']}")
-                else:
-                    logger.info(f"  -> Duplicate ID: {item['id']}")
-            
-        except Exception as e:
-            logger.error(f"Error extracting {url}: {e}")
-            
-    logger.info(f"\n=== 合計 {len(all_items)} アイテム収集完了 ===")
+            else:
+                logger.info(f"  -> Duplicate ID: {item['id']}")
+
+    if journal is not None:
+        journal.close()
+    get_default_cache().prune()
+    reused = len(target_items) - fetched - resumed
+    logger.info(
+        f"\n=== 合計 {len(all_items)} アイテム収集完了 (取得 {fetched} / 再開 {resumed} / 流用 {reused}) ==="
+    )
     return all_items
 
 
@@ -0,0 +1,369 @@
+"""
+カタログ（全アイテム）の正本を SQLite で保持するストア
+
+    items(id PRIMARY KEY, num, booth_url, fetched_at, type, shop_name, data)
+
+data はアイテムの JSON（items.ndjson の1行と同じ文字列）。それ以外の列は
+検索・並べ替え用にアイテムから取り出した値で、それぞれ索引を持つ。
+num は ID の数値部分（booth-12345 → 12345）で、公開順（ID の降順）はこの索引から読む。
+
+published(id, hash, fetched_at) は前回書き出した items.json の各アイテムの内容ハッシュと
+fetchedAt で、今回の書き出しとの差分（items_delta）を SQL の結合で求めるのに使う。
+
+マージは upsert() でバッチごとに1トランザクションにまとめて書く。
+items.json・シャード・items.ndjson の書き出しは索引順のクエリから1件ずつ流すので、
+全件をメモリに載せない。
+
+データベースはリポジトリにコミットしない（バイナリなので差分にならない）。
+代わりに実行ごとに items.ndjson へ公開順のスナップショットを書き出し（export_ndjson）、
+データベースが無い・スナップショットと食い違う（キャッシュが古い、手で直した等）
+ときは、スナップショットから作り直す（load_snapshot）。
+
+その場で集計したいときは sqlite3 で直接開ける:
+
+    sqlite3 docs/data/items.sqlite "SELECT type, COUNT(*) FROM items GROUP BY type"
+    sqlite3 docs/data/items.sqlite "SELECT id FROM items WHERE fetched_at < '2026-01-01'"
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+from catalog_store import CatalogStore
+from items_delta import HASH_VERSION, content_hash
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    num INTEGER,
+    booth_url TEXT,
+    fetched_at TEXT,
+    type TEXT,
+    shop_name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_num ON items (num);
+CREATE INDEX IF NOT EXISTS items_booth_url ON items (booth_url);
+CREATE INDEX IF NOT EXISTS items_fetched_at ON items (fetched_at);
+CREATE INDEX IF NOT EXISTS items_type ON items (type);
+CREATE INDEX IF NOT EXISTS items_shop_name ON items (shop_name);
+CREATE TABLE IF NOT EXISTS published (
+    id TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO items (id, num, booth_url, fetched_at, type, shop_name, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    num = excluded.num,
+    booth_url = excluded.booth_url,
+    fetched_at = excluded.fetched_at,
+    type = excluded.type,
+    shop_name = excluded.shop_name,
+    data = excluded.data
+"""
+
+# 公開順。数値でない ID は末尾（ID順）
+PUBLISHED_ORDER = "num IS NULL, num DESC, id"
+
+# IN (...) に並べるパラメータ数の上限（SQLite の既定の上限より小さく）
+_IN_CHUNK = 500
+_HASH_CHUNK = 1 << 20
+
+
+def id_number(item_id: str) -> Optional[int]:
+    """booth-12345 → 12345。数値でなければ None。"""
+    try:
+        return int(item_id.replace("booth-", ""))
+    except ValueError:
+        return None
+
+
+def _row(item: dict) -> tuple:
+    return (
+        item["id"],
+        id_number(item["id"]),
+        item.get("boothUrl"),
+        item.get("fetchedAt"),
+        item.get("type"),
+        item.get("shopName"),
+        # items.ndjson の1行と同じエンコード
+        json.dumps(item, ensure_ascii=False),
+    )
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CatalogDB:
+    """SQLite ファイルを正本とするアイテムストア（1スレッドから使う）。"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # トランザクションは transaction() で明示的に張る
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        version = self._get_meta("schema_version")
+        if version is None:
+            self._set_meta("schema_version", str(SCHEMA_VERSION))
+        elif int(version) != SCHEMA_VERSION:
+            raise RuntimeError(f"{self.path} のスキーマのバージョンが違います ({version} != {SCHEMA_VERSION})")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(published)")}
+        if "fetched_at" not in columns:
+            # fetched_at が無い頃の published: 列を足し、次の書き出しで今のカタログから作り直す
+            with self.transaction():
+                self._conn.execute("ALTER TABLE published ADD COLUMN fetched_at TEXT")
+                self._delete_meta("published_hash_version")
+
+    # --- meta ---
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _delete_meta(self, key: str) -> None:
+        self._conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # --- read ---
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def __contains__(self, item_id: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM items WHERE id = ?", (item_id,)).fetchone() is not None
+
+    def ids(self) -> list[str]:
+        """有効なアイテムIDを公開順（ID の数値の降順）で返す。"""
+        return [row[0] for row in self._conn.execute(f"SELECT id FROM items ORDER BY {PUBLISHED_ORDER}")]
+
+    def get(self, item_id: str) -> Optional[dict]:
+        row = self._conn.execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, item_ids: Iterable[str]) -> dict[str, dict]:
+        """ID → アイテム（無い ID は含まない）。"""
+        item_ids = list(item_ids)
+        items = {}
+        for start in range(0, len(item_ids), _IN_CHUNK):
+            chunk = item_ids[start:start + _IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            for item_id, data in self._conn.execute(
+                f"SELECT id, data FROM items WHERE id IN ({placeholders})", chunk
+            ):
+                items[item_id] = json.loads(data)
+        return items
+
+    def by_url(self) -> Mapping[str, dict]:
+        """boothUrl → アイテム の読み取り専用マッピング（参照時に索引から1件ずつ読む）。"""
+        return _ItemsByUrl(self)
+
+    def select(self, where: str = "", params: Iterable = ()) -> Iterator[dict]:
+        """
+        条件に合うアイテムを公開順に1件ずつ返す。
+
+        where は items の列（id, num, booth_url, fetched_at, type, shop_name）か
+        json_extract(data, '$.likes') などを使った SQL の条件式。
+        """
+        sql = "SELECT data FROM items"
+        if where:
+            sql += f" WHERE {where}"
+        for (data,) in self._conn.execute(f"{sql} ORDER BY {PUBLISHED_ORDER}", tuple(params)):
+            yield json.loads(data)
+
+    # --- write ---
+
+    def upsert(self, items: Iterable[dict]) -> int:
+        """アイテムを1トランザクションで追加・置き換えする。書いた件数を返す。"""
+        rows = [_row(item) for item in items]
+        if rows:
+            with self.transaction():
+                self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    # --- snapshot (items.ndjson) ---
+
+    def export_ndjson(self, path: Path) -> int:
+        """全アイテムを公開順の NDJSON に書き出す（一時ファイル経由で置き換え）。件数を返す。"""
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp")
+        count = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for (data,) in self._conn.execute(f"SELECT data FROM items ORDER BY {PUBLISHED_ORDER}"):
+                f.write(data + "\n")
+                count += 1
+        os.replace(tmp, path)
+        self._set_meta("snapshot_sha256", _file_sha256(path))
+        return count
+
+    def load_snapshot(self, path: Path) -> bool:
+        """
+        スナップショット（items.ndjson）が最後に書き出したものと違えば、そこから作り直す。
+
+        作り直したら True。スナップショットが無ければ何もしない。
+        追記形式だった頃の items.ndjson（同じ ID の行が複数ある）もそのまま読める。
+        """
+        path = Path(path)
+        if not path.exists():
+            return False
+        digest = _file_sha256(path)
+        if digest == self._get_meta("snapshot_sha256"):
+            return False
+
+        source = CatalogStore(path)
+        source.load_index()
+        with source, self.transaction():
+            self._conn.execute("DELETE FROM items")
+            self._conn.executemany(_UPSERT, (_row(source.get(item_id)) for item_id in source.ids()))
+            self._set_meta("snapshot_sha256", digest)
+            # 前回公開分のハッシュは次の書き出しで、作り直した内容から求め直す
+            self._conn.execute("DELETE FROM published")
+            self._delete_meta("published_last_updated")
+        logger.info(f"  {path.name} からカタログを作り直しました: {len(self)} アイテム")
+        return True
+
+    # --- 公開済みの内容ハッシュ（items_delta 用） ---
+
+    def published_last_updated(self) -> Optional[str]:
+        """
+        published が表す items.json の lastUpdated。published が無い・ハッシュの
+        計算方法が違う（HASH_VERSION）ときは None（有るが lastUpdated が不明なら ""）。
+        """
+        if self._get_meta("published_hash_version") != str(HASH_VERSION):
+            return None
+        return self._get_meta("published_last_updated")
+
+    def reset_published(self, last_updated: Optional[str]) -> None:
+        """今のカタログの内容を前回公開したものとみなして published を作り直す。"""
+        rows = self._conn.execute("SELECT id, data, fetched_at FROM items")
+        with self.transaction():
+            self._conn.execute("DELETE FROM published")
+            self._conn.executemany(
+                "INSERT INTO published (id, hash, fetched_at) VALUES (?, ?, ?)",
+                ((item_id, content_hash(json.loads(data)), fetched_at) for item_id, data, fetched_at in rows),
+            )
+            self._set_meta("published_last_updated", last_updated or "")
+            self._set_meta("published_hash_version", str(HASH_VERSION))
+
+    def start_publish(self) -> None:
+        """今回書き出すアイテムのハッシュの記録を始める（add_published で追加）。"""
+        self._conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS publishing (id TEXT PRIMARY KEY, hash TEXT NOT NULL, fetched_at TEXT)"
+        )
+        self._conn.execute("DELETE FROM publishing")
+
+    def add_published(self, hashes: Iterable[tuple[str, str, Optional[str]]]) -> None:
+        """(ID, 内容ハッシュ, fetchedAt) を書き出した順に追加する。"""
+        with self.transaction():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO publishing (id, hash, fetched_at) VALUES (?, ?, ?)", hashes
+            )
+
+    def commit_publish(
+        self, last_updated: str
+    ) -> tuple[dict[str, str], dict[str, str], dict[str, str], dict[str, str]]:
+        """
+        今回の書き出しを published にし、前回との差分を返す。
+
+        Returns:
+            (追加された ID → ハッシュ, 内容が変わった ID → 新しいハッシュ, 無くなった ID → 前回のハッシュ,
+            内容は同じで fetchedAt だけ変わった ID → 新しい fetchedAt)
+            removed 以外は書き出した順
+        """
+        added, changed = {}, {}
+        for item_id, item_hash, previous in self._conn.execute(
+            "SELECT c.id, c.hash, p.hash FROM publishing c LEFT JOIN published p ON p.id = c.id"
+            " WHERE p.hash IS NULL OR p.hash != c.hash ORDER BY c.rowid"
+        ):
+            (added if previous is None else changed)[item_id] = item_hash
+        removed = dict(self._conn.execute(
+            "SELECT p.id, p.hash FROM published p LEFT JOIN publishing c ON c.id = p.id"
+            " WHERE c.id IS NULL ORDER BY p.id"
+        ))
+        fetched_at = dict(self._conn.execute(
+            "SELECT c.id, c.fetched_at FROM publishing c JOIN published p ON p.id = c.id"
+            " WHERE p.hash = c.hash AND c.fetched_at IS NOT p.fetched_at ORDER BY c.rowid"
+        ))
+        with self.transaction():
+            self._conn.execute("DELETE FROM published")
+            self._conn.execute(
+                "INSERT INTO published (id, hash, fetched_at) SELECT id, hash, fetched_at FROM publishing"
+            )
+            self._conn.execute("DELETE FROM publishing")
+            self._set_meta("published_last_updated", last_updated)
+            self._set_meta("published_hash_version", str(HASH_VERSION))
+        return added, changed, removed, fetched_at
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "CatalogDB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _ItemsByUrl(Mapping):
+    def __init__(self, db: CatalogDB):
+        self._db = db
+
+    def __getitem__(self, url: str) -> dict:
+        # 同じ URL のアイテムが複数あれば最後に登録されたもの
+        row = self._db._conn.execute(
+            "SELECT data FROM items WHERE booth_url = ? ORDER BY rowid DESC LIMIT 1", (url,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(url)
+        return json.loads(row[0])
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._db._conn.execute(
+            "SELECT DISTINCT booth_url FROM items WHERE booth_url IS NOT NULL"
+        ))
+
+    def __len__(self) -> int:
+        return self._db._conn.execute(
+            "SELECT COUNT(DISTINCT booth_url) FROM items WHERE booth_url IS NOT NULL"
+        ).fetchone()[0]
@@ -0,0 +1,173 @@
+"""
+items.ndjson（カタログのスナップショット）の読み込みと items.json の書き出し
+
+カタログの正本は catalog_db（SQLite）。items.ndjson はそこから書き出す公開順の
+スナップショットで、CatalogStore はデータベースを作り直すとき（catalog_db.load_snapshot）に
+それを読む。1行 = 1アイテムの JSON で、同じ id の行が複数あれば後の行が有効
+（追記形式だった頃のファイルもそのまま読める）。
+読み込み時は id → 最新行のファイル位置 だけをメモリに持ち、アイテム本体は
+必要になった時にその行だけを読む。
+
+write_items_json() は items.json を1アイテムずつエンコードしながら書くため、
+件数が増えてもメモリを食わない。
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from run_report import get_report
+
+logger = logging.getLogger(__name__)
+
+# 索引作成時は行全体をデコードせず、キーの位置だけを拾う。
+# 文字列値の中の " は必ず \" にエスケープされるので、この並びはキーにしか現れない
+_ID_RE = re.compile(rb'"id": "([^"\\]*)"')
+
+_SCALAR_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_encode_str = json.encoder.encode_basestring
+
+
+class CatalogStore:
+    """items.ndjson の読み取り専用ビュー（load_index() してから ids() / get() で読む）。"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._offsets: dict[str, int] = {}
+        self._reader = None
+
+    # --- index ---
+
+    def load_index(self) -> None:
+        """ファイルを1回なめて id → 最新行の位置 を作る。"""
+        self.close()
+        self._offsets = {}
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                start = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                if not line.endswith(b"}\n"):
+                    # 書き込み中に中断された行など
+                    logger.warning(f"カタログの壊れた行をスキップしました (offset {start})")
+                    continue
+                id_match = _ID_RE.search(line)
+                if id_match:
+                    item_id = id_match.group(1).decode("utf-8")
+                else:
+                    # エスケープを含むなど、正規表現で拾えない行はデコードする
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"カタログの壊れた行をスキップしました (offset {start})")
+                        continue
+                    item_id = item["id"]
+                self._offsets[item_id] = start
+
+    def ids(self) -> list[str]:
+        """有効なアイテムIDを最初に登録された順で返す。"""
+        return list(self._offsets)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        offset = self._offsets.get(item_id)
+        if offset is None:
+            return None
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def __enter__(self) -> "CatalogStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _encode_indented(value, indent: str = "") -> str:
+    """json.dumps(value, ensure_ascii=False, indent=2) と同じ文字列を作る。
+
+    indent 指定の json.dumps は純Pythonのエンコーダになり遅いので、
+    入れ子の整形だけをここで行い、文字列・数値は C のエンコーダに任せる。
+    """
+    if isinstance(value, str):
+        return _encode_str(value)
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        inner = indent + "  "
+        return "{\n" + ",\n".join(
+            f"{inner}{_encode_str(str(key))}: {_encode_indented(v, inner)}"
+            for key, v in value.items()
+        ) + f"\n{indent}}}"
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return "[]"
+        inner = indent + "  "
+        return "[\n" + ",\n".join(
+            inner + _encode_indented(v, inner) for v in value
+        ) + f"\n{indent}]"
+    return _SCALAR_ENCODER.encode(value)
+
+
+def write_items_json(
+    items: Iterable[dict],
+    output_path: Path,
+    total: Optional[int] = None,
+    last_updated: Optional[str] = None,
+) -> int:
+    """
+    items.json を1アイテムずつエンコードしながら書き出す。
+
+    出力は json.dump(..., indent=2) と同じ形式。totalItems を先頭に書くため、
+    items がイテレータの場合は total（件数）を渡すこと。
+    last_updated を省略すると現在時刻。
+    一時ファイルに書いてから置き換えるので、途中で落ちても既存ファイルは壊れない。
+    """
+    if total is None:
+        items = list(items)
+        total = len(items)
+    if last_updated is None:
+        last_updated = datetime.now(timezone.utc).isoformat()
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_path.with_name(f"{output_path.name}.tmp")
+    count = 0
+    # items がジェネレータの場合（タグ付けしながら流す場合など）、その時間は含めず
+    # エンコードと書き込みの時間だけを実行レポートに計上する
+    wall = 0.0
+    cpu = 0.0
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        f.write(f'  "lastUpdated": {json.dumps(last_updated)},\n')
+        f.write(f'  "totalItems": {total},\n')
+        f.write('  "items": [')
+        for item in items:
+            started, started_cpu = time.perf_counter(), time.thread_time()
+            f.write(("\n    " if count == 0 else ",\n    ") + _encode_indented(item, "    "))
+            wall += time.perf_counter() - started
+            cpu += time.thread_time() - started_cpu
+            count += 1
+        f.write("\n  ]\n}" if count else "]\n}")
+    get_report().add_time("write_items_json", wall, cpu)
+    if count != total:
+        tmp.unlink()
+        raise ValueError(f"totalItems ({total}) と書き出した件数 ({count}) が一致しません")
+    os.replace(tmp, output_path)
+    return count
@@ -0,0 +1,124 @@
+"""
+ITEM LIST のフィルター（対象・テイスト・種別）用のファセットビットマップ
+
+各ファセット値について「その値を持つアイテム」のビットマップと件数を書き出す。
+フロントエンドはフィルターの組み合わせをビットマップの AND で求め、
+ボタンの件数も popcount で出せるので、全件を走査しなくてよい。
+
+ビットの番号は ITEM LIST の表示順（種別の昇順 → fetchedAt の新しい順）で振る。
+AND の結果をビット順に読めば、そのまま表示順に並んでいる。
+
+ファイル形式:
+    {
+      "version": 1,
+      "lastUpdated": "...",
+      "total": N,
+      "ids": ["booth-...", ...],                 # ビット番号 → id（表示順）
+      "facets": {
+        "gender": {"WOMEN'S": {"count": 10, "bitmap": "<base64>"}, ...},
+        "taste":  {...},
+        "type":   {...}
+      }
+    }
+
+bitmap はビット番号 i を (i // 8) バイト目の (i % 8) ビット目に置いたバイト列を
+4バイト境界まで 0 で埋めて base64 にしたもの。
+対象（gender）は list.html のタブと同じく、category に "ALL" を含むアイテムを全ての値に含める。
+"""
+
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+INDEX_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _timestamp_ms(value) -> int:
+    """fetchedAt をミリ秒に（ブラウザの Date と同じ精度で比べるため、マイクロ秒は切り捨て）。"""
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(milliseconds=1)
+
+
+def encode_bitmap(ordinals: list[int], total: int) -> str:
+    size = (total + 7) // 8
+    bitmap = bytearray(size + (-size) % 4)
+    for ordinal in ordinals:
+        bitmap[ordinal >> 3] |= 1 << (ordinal & 7)
+    return base64.b64encode(bytes(bitmap)).decode("ascii")
+
+
+class FacetIndexBuilder:
+    """
+    アイテムを受け取り、ファセットごとのビットマップを作る。
+
+    Args:
+        genders: 対象の語彙（"ALL" を展開する先）
+        tastes: テイストの語彙（件数0でも出力する）
+    """
+
+    def __init__(self, genders: tuple[str, ...], tastes: tuple[str, ...]):
+        self.genders = genders
+        self.tastes = tastes
+        # (種別, -取得時刻, 公開順, id, 対象, テイスト)
+        self._rows = []
+
+    def add(self, item: dict) -> None:
+        categories = item.get("category") or []
+        if not isinstance(categories, list):
+            categories = [categories]
+        genders = set(self.genders) if "ALL" in categories else set()
+        genders.update(c for c in categories if c != "ALL")
+        self._rows.append((
+            item.get("type") or "",
+            -_timestamp_ms(item.get("fetchedAt")),
+            len(self._rows),
+            item["id"],
+            tuple(genders),
+            tuple(item.get("taste") or ()),
+        ))
+
+    def to_dict(self, last_updated: str) -> dict:
+        rows = sorted(self._rows)
+        total = len(rows)
+        ordinals = {
+            "gender": {value: [] for value in self.genders},
+            "taste": {value: [] for value in self.tastes},
+            "type": {},
+        }
+        for ordinal, (item_type, _, _, _, genders, tastes) in enumerate(rows):
+            for gender in genders:
+                ordinals["gender"].setdefault(gender, []).append(ordinal)
+            for taste in tastes:
+                ordinals["taste"].setdefault(taste, []).append(ordinal)
+            ordinals["type"].setdefault(item_type, []).append(ordinal)
+
+        return {
+            "version": INDEX_VERSION,
+            "lastUpdated": last_updated,
+            "total": total,
+            "ids": [row[3] for row in rows],
+            "facets": {
+                facet: {
+                    value: {"count": len(values), "bitmap": encode_bitmap(values, total)}
+                    for value, values in by_value.items()
+                }
+                for facet, by_value in ordinals.items()
+            },
+        }
+
+    def write(self, path: Path, last_updated: str) -> None:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(
+            json.dumps(self.to_dict(last_updated), ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
@@ -4,11 +4,15 @@
 """
 
 import logging
+from collections.abc import Iterable
+from typing import Union
+
+from item_record import ItemRecord
 
 logger = logging.getLogger(__name__)
 
 
-def filter_items(items: list[dict], min_likes: int = 100) -> list[dict]:
+def filter_items(items: Iterable[Union[dict, ItemRecord]], min_likes: int = 100) -> list[dict]:
     """
     アイテムリストにフィルタリングを適用する。
 
@@ -18,13 +22,13 @@ def filter_items(items: list[dict], min_likes: int = 100) -> list[dict]:
     3. IDベースの重複排除
 
     Args:
-        items: 生データのアイテムリスト
+        items: 生データのアイテム（dict か ItemRecord）
         min_likes: 最小いいね数（デフォルト: 100）
 
     Returns:
-        フィルタ済みアイテムリスト
+        フィルタ済みアイテムリスト（新しい dict。入力は変更しない）
     """
-    original_count = len(items)
+    original_count = 0
     filtered = []
     seen_ids = set()
 
@@ -33,6 +37,7 @@ def filter_items(items: list[dict], min_likes: int = 100) -> list[dict]:
     duplicates_removed = 0
 
     for item in items:
+        original_count += 1
         # R18除外
         if item.get("isR18", False):
             r18_removed += 1
@@ -51,7 +56,8 @@ def filter_items(items: list[dict], min_likes: int = 100) -> list[dict]:
         seen_ids.add(item_id)
 
         # isR18フラグはフロントに不要なので削除
-        clean_item = {k: v for k, v in item.items() if k != "isR18"}
+        source = item.to_dict() if isinstance(item, ItemRecord) else item
+        clean_item = {k: v for k, v in source.items() if k != "isR18"}
         filtered.append(clean_item)
 
     logger.info(f"フィルタリング結果:")
@@ -0,0 +1,474 @@
+"""
+条件付きGET対応のオンディスクHTTPキャッシュ
+
+全スクレイパー共通。session を省略した場合は http_client の共通クライアントで取得する。
+レスポンスの ETag / Last-Modified を保存し、
+次回は If-None-Match / If-Modified-Since を付けて問い合わせる。
+304 Not Modified の場合は保存済みの本文（または解析結果）を再利用するため、
+変化のないページの転送量がほぼゼロになる。
+
+キャッシュは TTL（最終検証からの経過時間）とディスク使用量の上限で掃除する。
+
+モード（VRC_HTTP_MODE）:
+    live     通常（デフォルト）
+    record   検証子の無いレスポンスも本文を保存する（後で replay するための記録）
+    replay   ネットワークに一切出ず、保存済みの本文だけで応答する（無ければ 504）。
+             プロファイルやパーサの確認を BOOTH に触れずにオフラインで行う用
+
+環境変数:
+    VRC_HTTP_CACHE_DIR   キャッシュディレクトリ（デフォルト: <repo>/.cache/http）
+    VRC_HTTP_CACHE       "0" / "off" で無効化（record / replay では無視）
+    VRC_HTTP_MODE        live / record / replay
+"""
+
+import codecs
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import requests
+
+from http_client import get_default_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "http"
+# 最終検証からこれ以上経ったエントリは捨てて取り直す
+DEFAULT_TTL = 14 * 24 * 3600
+# 本文は gzip で保存する（BOOTH 1,700件で数十MB程度）
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+HTTP_MODES = ("live", "record", "replay")
+
+# 一時的なエラー（保存済みのエントリを消さない）
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# get_parsed が途中で読むのをやめたとき、残りがこれ以下なら読み切って接続を使い回す（keep-alive）
+DRAIN_BYTES = 64 * 1024
+
+
+class CachedResponse:
+    """requests.Response の必要部分だけを持つ軽量レスポンス。
+
+    not_modified が True の場合、本文はキャッシュから復元したもの。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        content: bytes,
+        encoding: Optional[str],
+        headers: Optional[dict] = None,
+        not_modified: bool = False,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers or {}
+        self.not_modified = not_modified
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+    @classmethod
+    def from_response(cls, response: requests.Response) -> "CachedResponse":
+        return cls(
+            url=response.url or "",
+            status_code=response.status_code,
+            content=response.content,
+            encoding=response.encoding or response.apparent_encoding,
+            headers=dict(response.headers),
+        )
+
+
+def _incremental_decoder(encoding: str) -> codecs.IncrementalDecoder:
+    """チャンクの境界で切れた文字を次のチャンクにつなげて復号するデコーダ。"""
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _remaining_wire_bytes(response: requests.Response) -> Optional[int]:
+    """Content-Length から求めた未受信のバイト数（分からなければ None）。"""
+    try:
+        return int(response.headers["Content-Length"]) - response.raw.tell()
+    except (KeyError, ValueError, AttributeError, OSError):
+        return None
+
+
+def _wire_bytes(response: requests.Response, decoded_bytes: int) -> int:
+    """受信した転送バイト数（圧縮されたまま）。raw から読めなければ展開後のバイト数。"""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return decoded_bytes
+
+
+class HttpCache:
+    """URL単位のオンディスクキャッシュ。
+
+    1エントリ = <sha256(url)>.json（メタデータ・解析結果） + <sha256(url)>.body.gz（本文）
+    書き込みは一時ファイル経由の置換なので、複数スレッドから使ってよい。
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = True,
+        mode: str = "live",
+    ):
+        if mode not in HTTP_MODES:
+            raise ValueError(f"unknown HTTP mode: {mode}")
+        self.directory = Path(directory or DEFAULT_CACHE_DIR)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled or mode != "live"
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "bytes_downloaded": 0}
+
+    # --- paths / IO ---
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _body_path(self, key: str) -> Path:
+        return self.directory / f"{key}.body.gz"
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        try:
+            return json.loads(self._meta_path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, key: str, meta: dict) -> None:
+        self._write_atomic(self._meta_path(key), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+
+    def _read_body(self, key: str) -> Optional[bytes]:
+        try:
+            return gzip.decompress(self._body_path(key).read_bytes())
+        except (OSError, EOFError, gzip.BadGzipFile):
+            return None
+
+    def _delete(self, key: str) -> None:
+        for path in (self._meta_path(key), self._body_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _is_expired(self, meta: dict) -> bool:
+        return time.time() - meta.get("validated_at", 0) > self.ttl
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+    @property
+    def offline(self) -> bool:
+        """replay モード（ネットワークに出ないので、リクエスト間隔の待機も不要）。"""
+        return self.mode == "replay"
+
+    def _replay(self, url: str) -> CachedResponse:
+        self._count("requests")
+        key = self._key(url)
+        meta = self._load_meta(key) or {}
+        body = self._read_body(key)
+        if body is None:
+            logger.warning(f"replay: 記録がありません: {url}")
+            return CachedResponse(url=url, status_code=504, content=b"", encoding=None)
+        # 解析処理を通すため、not_modified にはしない
+        return CachedResponse(url=url, status_code=200, content=body, encoding=meta.get("encoding"))
+
+    # --- public API ---
+
+    def get(
+        self,
+        url: str,
+        session: Optional[requests.Session] = None,
+        headers: Optional[dict] = None,
+        timeout: float = 30,
+        **kwargs,
+    ) -> CachedResponse:
+        """条件付きGET。304 なら保存済み本文を not_modified=True で返す。"""
+        if self.offline:
+            return self._replay(url)
+        getter = (session or get_default_client()).get
+        if not self.enabled:
+            response = getter(url, headers=headers, timeout=timeout, **kwargs)
+            return CachedResponse.from_response(response)
+
+        key = self._key(url)
+        meta = self._load_meta(key)
+        if meta and self._is_expired(meta):
+            meta = None
+
+        request_headers = dict(headers or {})
+        if meta:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        self._count("requests")
+        response = getter(url, headers=request_headers, timeout=timeout, **kwargs)
+
+        if response.status_code == 304 and meta:
+            body = self._read_body(key)
+            if body is not None:
+                self._count("not_modified")
+                meta["validated_at"] = time.time()
+                self._save_meta(key, meta)
+                return CachedResponse(
+                    url=url,
+                    status_code=200,
+                    content=body,
+                    encoding=meta.get("encoding"),
+                    headers=dict(response.headers),
+                    not_modified=True,
+                )
+            # 本文が失われている場合は無条件で取り直す
+            response = getter(url, headers=headers, timeout=timeout, **kwargs)
+
+        self._count("bytes_downloaded", _wire_bytes(response, len(response.content)))
+        result = CachedResponse.from_response(response)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified or self.mode == "record"):
+            self._write_atomic(self._body_path(key), gzip.compress(response.content, compresslevel=6))
+            self._save_meta(key, {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "encoding": result.encoding,
+                "validated_at": time.time(),
+            })
+        elif meta and response.status_code not in TRANSIENT_STATUSES:
+            # 検証子が無くなった / エラー応答: 古い内容を使い続けないよう削除
+            # （429 / 5xx は一時的なので、再試行で 304 を使えるよう残す）
+            self._delete(key)
+
+        return result
+
+    def get_parsed(
+        self,
+        url: str,
+        version: str,
+        parse: Callable[[str], Optional[Any]],
+        session: Optional[requests.Session] = None,
+        headers: Optional[dict] = None,
+        timeout: float = 30,
+        chunk_size: int = 16 * 1024,
+        max_bytes: int = 2 * 1024 * 1024,
+    ) -> tuple[int, Optional[Any]]:
+        """
+        本文を先頭から少しずつ読み、解析結果が得られた時点で読むのをやめる条件付きGET。
+        残りが DRAIN_BYTES 以下なら読み捨てて接続を使い回し、それより多ければ接続を閉じる。
+
+        parse は読み込み済みの本文（先頭部分）を受け取り、結果が確定したらその値を、
+        まだ読む必要があれば None を返す。max_bytes まで読んでも確定しなければ None。
+        本文は保存せず、検証子と解析結果だけをキャッシュする。
+        304 なら保存済みの解析結果を返す。
+
+        Returns:
+            (ステータスコード, 解析結果)
+        """
+        if self.offline:
+            meta = self._load_meta(self._key(url)) or {}
+            parsed = meta.get("parsed") or {}
+            if parsed.get("version") == version:
+                self._count("requests")
+                return 200, parsed.get("value")
+            response = self._replay(url)
+            if response.status_code != 200:
+                return response.status_code, None
+            return 200, parse(response.text)
+
+        getter = (session or get_default_client()).get
+        key = self._key(url)
+        meta = self._load_meta(key) if self.enabled else None
+        if meta and self._is_expired(meta):
+            meta = None
+        parsed = (meta or {}).get("parsed") or {}
+
+        request_headers = dict(headers or {})
+        if meta and parsed.get("version") == version:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        self._count("requests")
+        with getter(url, headers=request_headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and parsed.get("version") == version:
+                self._count("not_modified")
+                meta["validated_at"] = time.time()
+                self._save_meta(key, meta)
+                return 200, parsed.get("value")
+            if response.status_code != 200:
+                if meta and response.status_code not in TRANSIENT_STATUSES:
+                    # get() と同じく、429 / 5xx では検証子と解析結果を残す
+                    self._delete(key)
+                return response.status_code, None
+
+            text = ""
+            received = 0
+            value = None
+            encoding = response.encoding or "utf-8"
+            decoder = _incremental_decoder(encoding)
+            chunks = response.iter_content(chunk_size)
+            for chunk in chunks:
+                received += len(chunk)
+                # 新しいチャンクの分だけ復号する（読み込み済みの部分を毎回復号し直さない）
+                text += decoder.decode(chunk)
+                value = parse(text)
+                if value is not None or received >= max_bytes:
+                    break
+            else:
+                chunks = ()  # 最後まで読んだ
+            # 途中でやめた場合、残りが少なければ読み捨てて接続をプールに戻す（多ければ with を出るときに閉じる）
+            remaining = _remaining_wire_bytes(response)
+            if remaining is not None and remaining > DRAIN_BYTES:
+                chunks = ()
+            drained = 0
+            for chunk in chunks:
+                drained += len(chunk)
+                if drained > DRAIN_BYTES:
+                    break
+            self._count("bytes_downloaded", _wire_bytes(response, received + drained))
+
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+        if self.enabled:
+            if value is not None and (etag or last_modified or self.mode == "record"):
+                # 本文は持たないので、前回の本文が残っていれば消しておく
+                self._delete(key)
+                self._save_meta(key, {
+                    "url": url,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "encoding": encoding,
+                    "validated_at": time.time(),
+                    "parsed": {"version": version, "value": value},
+                })
+            elif meta:
+                self._delete(key)
+        return 200, value
+
+    def load_parsed(self, url: str, version: str) -> Optional[Any]:
+        """本文が変わっていない間だけ有効な解析結果を返す（version 不一致なら None）。"""
+        if not self.enabled:
+            return None
+        meta = self._load_meta(self._key(url))
+        if not meta:
+            return None
+        parsed = meta.get("parsed")
+        if not parsed or parsed.get("version") != version:
+            return None
+        return parsed.get("value")
+
+    def store_parsed(self, url: str, version: str, value: Any) -> None:
+        """直近に取得した本文の解析結果を保存する。JSON化できる値のみ。"""
+        if not self.enabled:
+            return
+        key = self._key(url)
+        meta = self._load_meta(key)
+        if not meta:
+            return  # 検証子のないレスポンスは再利用できないので保存しない
+        meta["parsed"] = {"version": version, "value": value}
+        self._save_meta(key, meta)
+
+    def prune(self) -> None:
+        """TTL切れのエントリを削除し、合計サイズが上限を超えていれば古い順に削除する。"""
+        if not self.enabled or self.offline or not self.directory.exists():
+            return
+
+        entries = []
+        total = 0
+        removed = 0
+        for meta_path in self.directory.glob("*.json"):
+            key = meta_path.stem
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._delete(key)
+                removed += 1
+                continue
+            if self._is_expired(meta):
+                self._delete(key)
+                removed += 1
+                continue
+            size = meta_path.stat().st_size
+            body_path = self._body_path(key)
+            if body_path.exists():
+                size += body_path.stat().st_size
+            entries.append((meta.get("validated_at", 0), key, size))
+            total += size
+
+        entries.sort()
+        for _, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._delete(key)
+            total -= size
+            removed += 1
+
+        logger.info(
+            f"HTTPキャッシュ: {self.stats['requests']} リクエスト / "
+            f"304再利用 {self.stats['not_modified']} / "
+            f"受信 {self.stats['bytes_downloaded'] / 1024:.0f} KiB / "
+            f"削除 {removed} / 保持 {total / 1024 / 1024:.1f} MiB"
+        )
+
+
+_default_cache: Optional[HttpCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> HttpCache:
+    """プロセス共通のキャッシュを返す（環境変数で場所・有効/無効を切り替え）。"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            directory = os.environ.get("VRC_HTTP_CACHE_DIR")
+            enabled = os.environ.get("VRC_HTTP_CACHE", "1").lower() not in ("0", "off", "false", "no")
+            mode = os.environ.get("VRC_HTTP_MODE", "live").lower()
+            _default_cache = HttpCache(directory=Path(directory) if directory else None, enabled=enabled, mode=mode)
+            if mode != "live":
+                logger.info(f"HTTPキャッシュ: {mode} モード ({_default_cache.directory})")
+        return _default_cache
+
+
+def cached_get(url: str, session: Optional[requests.Session] = None, **kwargs) -> CachedResponse:
+    """get_default_cache().get() のショートカット。"""
+    return get_default_cache().get(url, session=session, **kwargs)
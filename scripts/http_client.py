@@ -0,0 +1,150 @@
+"""
+全スクレイパー共通のHTTPクライアント
+
+プロセス全体で1つの requests.Session を共有し、次をまとめて扱う。
+
+    - ホストごとの Keep-Alive 接続プール（TLS ハンドシェイクを使い回す）
+    - 既定のタイムアウト（接続・読み込み）。呼び出し側で指定しなくても無限に待たない
+    - Accept-Encoding: br（brotli モジュールがある場合）/ gzip / deflate
+    - ホストごとの同時接続数の上限
+    - 全リクエストの件数・ステータス・転送量・レイテンシを run_report に記録
+
+リクエスト間隔（マナー設定）は throttle.HostRateLimiter で別に制御する。
+同時接続数の上限は「同じホストへ同時に張る接続の数」、間隔は「送信の頻度」を抑える。
+
+環境変数:
+    VRC_HTTP_MAX_PER_HOST   ホストごとの同時接続数（デフォルト: DEFAULT_MAX_PER_HOST）
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from run_report import get_report
+from throttle import default_host_key
+
+try:
+    import brotli  # noqa: F401  urllib3 が br の展開に使う
+    ACCEPT_ENCODING = "br, gzip, deflate"
+except ImportError:  # 任意依存。無ければ br を要求しない
+    ACCEPT_ENCODING = "gzip, deflate"
+
+USER_AGENT = "VRC-LIFE Portal Bot"
+# (接続, 読み込み) 秒
+DEFAULT_TIMEOUT = (10, 30)
+DEFAULT_MAX_PER_HOST = 4
+# 接続プールを保持するホスト数
+POOL_HOSTS = 32
+
+
+class HttpClient(requests.Session):
+    """
+    既定のタイムアウトとホスト単位の同時接続数制限を持つ Session。
+
+    requests.Session のサブクラスなので、session を受け取る既存の関数
+    （http_cache.HttpCache.get など）にそのまま渡せる。複数スレッドから共有してよい。
+
+    stream=True のリクエストは、レスポンスを close する（with で使う）まで枠を占有する。
+
+    Args:
+        timeout: 既定のタイムアウト（リクエストごとの timeout 指定が優先）
+        max_per_host: ホストごとの同時接続数
+        host_limits: ホストキー → 同時接続数 の個別設定
+        key_func: URL→ホストキー変換
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        max_per_host: int = DEFAULT_MAX_PER_HOST,
+        host_limits: Optional[dict[str, int]] = None,
+        key_func: Optional[Callable[[str], str]] = None,
+    ):
+        super().__init__()
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.host_limits = dict(host_limits or {})
+        self.key_func = key_func or default_host_key
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+        self.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+        # プールの接続数は同時接続数の上限に合わせる（超えた接続は使い捨てになるため）
+        pool_size = max([max_per_host, *self.host_limits.values()])
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def set_host_limit(self, host: str, limit: int) -> None:
+        """ホストキーごとの同時接続数を設定する（そのホストへの最初のリクエストより前に呼ぶ）。"""
+        with self._slots_lock:
+            self.host_limits[host] = limit
+            self._slots.pop(host, None)
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        key = self.key_func(url)
+        with self._slots_lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.host_limits.get(key, self.max_per_host))
+                self._slots[key] = slot
+            return slot
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        slot = self._slot(url)
+        slot.acquire()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        if not kwargs.get("stream"):
+            slot.release()
+            _record(response)
+            return response
+
+        # 本文を読み終えて close されるまで枠を保持する（受信量はその時点で記録）
+        close = response.close
+        released = False
+
+        def close_and_release():
+            nonlocal released
+            try:
+                close()
+            finally:
+                if not released:
+                    released = True
+                    slot.release()
+                    _record(response)
+
+        response.close = close_and_release
+        return response
+
+
+def _record(response: requests.Response) -> None:
+    """実行レポートに1リクエスト分を記録する（受信量は圧縮されたままの転送バイト数）。"""
+    try:
+        nbytes = response.raw.tell()
+    except (AttributeError, OSError):
+        nbytes = 0
+    get_report().record_request(response.url, response.status_code, response.elapsed.total_seconds(), nbytes)
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def get_default_client() -> HttpClient:
+    """プロセス共通のクライアントを返す。"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            max_per_host = int(os.environ.get("VRC_HTTP_MAX_PER_HOST", DEFAULT_MAX_PER_HOST))
+            _default_client = HttpClient(max_per_host=max_per_host)
+        return _default_client
@@ -0,0 +1,129 @@
+"""
+メモリ上のアイテムの軽量表現
+
+カタログの JSON スキーマ（items.json / items.ndjson の1アイテム）は dict のままだと
+1件ごとにキー表を持ち、category / taste のリストや type などの同じ文字列も
+アイテムごとに別のオブジェクトになる。件数が多い間ずっと保持する新規取得分などは
+ItemRecord に変換して持つ。
+
+    - __slots__ で属性を固定（dict のキー表を持たない）
+    - type / display_type / manual_* / shopName は sys.intern で1つの文字列を共有
+    - category / taste は interned な文字列のタプルにし、同じ組み合わせは1つのタプルを共有
+
+JSON との変換は from_dict() / to_dict()。キーの順序は元の dict と同じになるよう
+FIELDS の順で出力し、知らないキーは extra に入れて末尾にそのまま戻す。
+値が無いフィールド（キーが無かった）は to_dict() で出力しない。
+"""
+
+import sys
+from collections.abc import Iterable
+from typing import Any, Optional, Union
+
+# (属性名, JSON のキー)。to_dict() はこの順で出力する
+FIELDS = (
+    ("id", "id"),
+    ("name", "name"),
+    ("price", "price"),
+    ("shop_name", "shopName"),
+    ("booth_url", "boothUrl"),
+    ("thumbnail_url", "thumbnailUrl"),
+    ("likes", "likes"),
+    ("is_r18", "isR18"),
+    ("description", "description"),
+    ("fetched_at", "fetchedAt"),
+    ("manual_item_type", "manual_item_type"),
+    ("manual_gender", "manual_gender"),
+    ("category", "category"),
+    ("taste", "taste"),
+    ("type", "type"),
+    ("display_type", "display_type"),
+)
+
+_ATTR_BY_KEY = {key: attr for attr, key in FIELDS}
+
+# 種類の少ない値（共有する）
+_INTERNED_KEYS = frozenset({"shopName", "manual_item_type", "manual_gender", "type", "display_type"})
+# 文字列のリスト（タプルにして共有する）
+_TAG_KEYS = frozenset({"category", "taste"})
+
+
+class _Missing:
+    """キーが無かったことを表す値（None は JSON の null として区別する）。"""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+_tag_tuples: dict[tuple, tuple] = {}
+
+
+def intern_tags(values: Iterable[str]) -> tuple[str, ...]:
+    """タグのリストを interned な文字列のタプルにする（同じ内容なら同じオブジェクト）。"""
+    tags = tuple(sys.intern(value) if type(value) is str else value for value in values)
+    return _tag_tuples.setdefault(tags, tags)
+
+
+def _compact(key: str, value: Any) -> Any:
+    if key in _INTERNED_KEYS and type(value) is str:
+        return sys.intern(value)
+    if key in _TAG_KEYS and isinstance(value, list):
+        return intern_tags(value)
+    return value
+
+
+class ItemRecord:
+    """1アイテム。属性名は FIELDS、無いフィールドは MISSING。"""
+
+    __slots__ = tuple(attr for attr, _ in FIELDS) + ("extra",)
+
+    def __init__(self, **fields):
+        for attr, key in FIELDS:
+            setattr(self, attr, _compact(key, fields.pop(attr, MISSING)))
+        self.extra: Optional[dict] = fields or None
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "ItemRecord":
+        record = cls.__new__(cls)
+        for attr, key in FIELDS:
+            setattr(record, attr, _compact(key, item.get(key, MISSING)))
+        extra = {key: value for key, value in item.items() if key not in _ATTR_BY_KEY}
+        record.extra = extra or None
+        return record
+
+    @classmethod
+    def coerce(cls, item: Union[dict, "ItemRecord"]) -> "ItemRecord":
+        return item if isinstance(item, ItemRecord) else cls.from_dict(item)
+
+    def to_dict(self) -> dict:
+        """JSON スキーマの dict（呼び出しごとに新しい dict・リスト）。"""
+        item = {}
+        for attr, key in FIELDS:
+            value = getattr(self, attr)
+            if value is MISSING:
+                continue
+            item[key] = list(value) if key in _TAG_KEYS and type(value) is tuple else value
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict と同じキーで値を読む（無ければ default）。"""
+        attr = _ATTR_BY_KEY.get(key)
+        if attr is None:
+            return (self.extra or {}).get(key, default)
+        value = getattr(self, attr)
+        return default if value is MISSING else value
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ItemRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ItemRecord(id={self.id!r}, name={self.name!r})"
@@ -0,0 +1,109 @@
+"""
+items.json の差分（items.delta.json）
+
+run_pipeline は items.json を書き出すたびに、前回の items.json からの差分を
+items.delta.json として書く。前回のデータを持っているクライアントやミラーは
+全件を取り直さずに追従できる。
+
+    {
+      "version": 3,
+      "previousLastUpdated": "...",     前回の items.json の lastUpdated（差分の起点）
+      "lastUpdated": "...",             今回の items.json の lastUpdated
+      "totalItems": 1700,
+      "added":   {"booth-...": "<hash>"},  追加された ID → 内容ハッシュ
+      "changed": {"booth-...": "<hash>"},  内容が変わった ID → 新しい内容ハッシュ
+      "removed": {"booth-...": "<hash>"},  無くなった ID → 前回の内容ハッシュ
+      "fetchedAt": {"booth-...": "..."},  内容は同じまま fetchedAt だけ変わった ID → 新しい fetchedAt
+      "items":   {"booth-...": {...}}      added / changed のアイテム本体
+    }
+
+配信用なので空白なしで書く（publish.minify と同じ）。
+
+使い方: 手元の lastUpdated が previousLastUpdated と同じなら、removed を消し、
+items で追加・置き換え、fetchedAt の ID の fetchedAt を書き換えて、ID の降順に
+並べ直せば、今回の items.json と同じになる（fetchedAt で並べる画面の順序も一致する）。
+違う（1回以上取りこぼした）なら items.json（またはシャード）を全件取り直す。
+
+内容ハッシュはキーをソートした JSON の SHA-256（content_hash）。再取得のたびに
+変わるだけの記録用のフィールド（BOOKKEEPING_KEYS）は含めないので、内容が同じまま
+再取得されたアイテムは changed に入らず、本体の代わりに新しい値だけを fetchedAt で送る。
+前回公開した全アイテムのハッシュと fetchedAt はカタログ（catalog_db の published テーブル）に持ち、
+SQL の結合で追加・変更・削除を求める。
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+DELTA_NAME = "items.delta.json"
+DELTA_VERSION = 3
+HASH_LENGTH = 16
+# content_hash の計算方法のバージョン（変えたら published を作り直す）
+HASH_VERSION = 2
+# 内容ハッシュに含めないフィールド（取得のたびに変わる記録用の値）
+BOOKKEEPING_KEYS = frozenset({"fetchedAt"})
+
+_LAST_UPDATED_RE = re.compile(r'"lastUpdated":\s*"([^"]*)"')
+# write_items_json は lastUpdated を先頭に書くので、ファイルの先頭だけを読めばよい
+_HEAD_BYTES = 4096
+
+
+def content_hash(item: dict) -> str:
+    """アイテムの内容のハッシュ（キーの順序・BOOKKEEPING_KEYS によらない）。"""
+    content = {key: value for key, value in item.items() if key not in BOOKKEEPING_KEYS}
+    data = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def delta_path_for(output_path: Path) -> Path:
+    """items.json と同じディレクトリの差分ファイルのパス。"""
+    return Path(output_path).parent / DELTA_NAME
+
+
+def read_last_updated(items_json_path: Path) -> Optional[str]:
+    """既存の items.json の lastUpdated（全体は読まない）。無ければ None。"""
+    try:
+        with open(items_json_path, "r", encoding="utf-8") as f:
+            head = f.read(_HEAD_BYTES)
+    except OSError:
+        return None
+    match = _LAST_UPDATED_RE.search(head)
+    return match.group(1) if match else None
+
+
+def write_delta(
+    path: Path,
+    previous_last_updated: Optional[str],
+    last_updated: str,
+    total: int,
+    added: dict[str, str],
+    changed: dict[str, str],
+    removed: dict[str, str],
+    fetched_at: dict[str, str],
+    items: dict[str, dict],
+) -> dict:
+    """
+    差分ファイルを書き、ID の件数の要約を返す。
+
+    added / changed / removed は ID → 内容ハッシュ、fetched_at は内容は同じで fetchedAt だけが
+    変わった ID → 新しい fetchedAt、items は added / changed のアイテム本体。
+    """
+    delta = {
+        "version": DELTA_VERSION,
+        "previousLastUpdated": previous_last_updated,
+        "lastUpdated": last_updated,
+        "totalItems": total,
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "fetchedAt": fetched_at,
+        "items": {item_id: items[item_id] for item_id in (*added, *changed) if item_id in items},
+    }
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(delta, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return {"added": len(added), "changed": len(changed), "removed": len(removed), "fetchedAt": len(fetched_at)}
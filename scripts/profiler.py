@@ -0,0 +1,286 @@
+"""
+プロファイル（--profile）
+
+各エントリポイント（run_pipeline.py / run_stages.py / scraper_*.py）の --profile で有効になり、
+ステージごとに次を書き出す（デフォルト: .cache/profile/<日時>/）。
+
+    <stage>.prof        cProfile の統計（pstats / snakeviz などで開く）。ワーカースレッドの分も合算
+    <stage>.txt         上の統計の累積時間順の上位
+    <stage>.collapsed   サンプリングしたスタックの collapsed 形式（flamegraph.pl / speedscope 用）
+    <stage>.memory.txt  ステージ開始時と終了時の tracemalloc スナップショットの差分の上位
+    summary.json        ステージごとの実時間・CPU時間・サンプル数・メモリのピーク
+
+cProfile は関数単位の合計しか持たないので、flamegraph 用のスタックは別に
+SAMPLE_INTERVAL ごとに sys._current_frames() を読むサンプラーで集める。
+サンプルは実時間基準なので、ロックや通信の待ちもスタックとして現れる。
+対象はステージを実行しているスレッドと、ステージ中に作られたスレッド。
+タグ付けの子プロセス（--tag-workers）は対象外なので、タグ付けを見るときは --tag-workers 1 で実行する。
+
+HTTP は --record-http で本文を記録し、--replay-http で記録だけを使ってオフラインで
+再実行できる（http_cache の VRC_HTTP_MODE）。解析・タグ付けだけを繰り返し計測する用。
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_ROOT = Path(__file__).resolve().parent.parent / ".cache" / "profile"
+SUMMARY_NAME = "summary.json"
+
+# スタックのサンプリング間隔（秒）
+SAMPLE_INTERVAL = 0.005
+# .txt / .memory.txt に出す行数
+TOP_N = 40
+# tracemalloc が保持するスタックの深さ
+TRACEMALLOC_FRAMES = 8
+# 3.12 以降の cProfile は sys.monitoring の上にあり、有効にした1つの Profile が全スレッドの
+# 呼び出しを集計する（2つ目の Profile は有効にできない: ValueError）。
+# それより前はスレッドごとに Profile を有効にして、終了後に合算する
+PROFILE_PER_THREAD = sys.version_info < (3, 12)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # 行番号は関数の先頭（同じ関数のサンプルを1つのノードにまとめる）
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _StageProfile:
+    """1ステージ分の計測（cProfile・スタックのサンプリング・tracemalloc）。"""
+
+    def __init__(self, name: str, sample_interval: float):
+        self.name = name
+        self.sample_interval = sample_interval
+        self.owner = threading.get_ident()
+        self.thread_ids = {self.owner}
+        self.thread_profiles: list[tuple[threading.Thread, cProfile.Profile]] = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.profile = cProfile.Profile()
+
+    def _thread_hook(self, *args) -> None:
+        # threading.setprofile のフック。ステージ中に作られたスレッドの最初のイベントで一度だけ呼ばれる。
+        # ここで例外を出すとスレッドが処理を始める前に終わってしまうので、失敗してもサンプリングだけは続ける
+        sys.setprofile(None)
+        with self._lock:
+            self.thread_ids.add(threading.get_ident())
+        if not PROFILE_PER_THREAD:
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 他のプロファイラが有効（このスレッドはスタックのサンプリングだけ）
+            return
+        with self._lock:
+            self.thread_profiles.append((threading.current_thread(), profile))
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self.thread_ids)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.name}", daemon=True)
+        self._sampler.start()
+        threading.setprofile(self._thread_hook)
+        self.profile.enable()
+
+    def stop(self) -> pstats.Stats:
+        self.profile.disable()
+        threading.setprofile(None)
+        self._stop.set()
+        self._sampler.join()
+
+        stats = pstats.Stats(self.profile)
+        with self._lock:
+            thread_profiles = list(self.thread_profiles)
+        for thread, profile in thread_profiles:
+            # 実行中のスレッドの統計は読めないので、終了したスレッドの分だけ合算する
+            if thread.is_alive():
+                logger.warning(f"プロファイル: {self.name} の終了時に実行中のスレッド {thread.name} は集計しません")
+                continue
+            try:
+                stats.add(profile)
+            except TypeError:
+                # 一度も関数を呼ばずに終わったスレッド（統計が空）
+                pass
+        return stats
+
+
+class Profiler:
+    """
+    ステージ単位のプロファイラ。output_dir が None なら何もしない（stage() はそのまま実行する）。
+
+        profiler = Profiler(Path(".cache/profile/x"))
+        with profiler.stage("collect"):
+            ...
+        profiler.write_summary()
+
+    ステージは入れ子にせず、同時に1つだけ実行する（cProfile はスレッドに1つしか有効にできない）。
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None, sample_interval: float = SAMPLE_INTERVAL, top: int = TOP_N):
+        self.output_dir = Path(output_dir) if output_dir is not None else None
+        self.sample_interval = sample_interval
+        self.top = top
+        self.stages: dict[str, dict] = {}
+        self._active = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.output_dir is not None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        if not self._active.acquire(blocking=False):
+            raise RuntimeError(f"プロファイル中のステージがあるため {name} は計測できません（ステージは1つずつ実行してください）")
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            wall = time.perf_counter()
+            cpu = time.process_time()
+
+            profile = _StageProfile(name, self.sample_interval)
+            profile.start()
+            try:
+                yield
+            finally:
+                wall = time.perf_counter() - wall
+                cpu = time.process_time() - cpu
+                # 統計の集計で確保するメモリを含めないよう、先にスナップショットを取る
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                stats = profile.stop()
+                self._write_stage(name, profile, stats, before, after)
+                self.stages[name] = {
+                    "wallSeconds": round(wall, 3),
+                    "cpuSeconds": round(cpu, 3),
+                    "threads": len(profile.thread_ids),
+                    "samples": profile.samples,
+                    "tracedMemoryMiB": round(current / 2**20, 1),
+                    "peakMemoryMiB": round(peak / 2**20, 1),
+                }
+                logger.info(f"プロファイル: {name} → {self.output_dir / name}.*")
+        finally:
+            self._active.release()
+
+    def _write_stage(
+        self,
+        name: str,
+        profile: _StageProfile,
+        stats: pstats.Stats,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+    ) -> None:
+        base = self.output_dir / name
+        stats.dump_stats(f"{base}.prof")
+
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        Path(f"{base}.txt").write_text(text.getvalue(), encoding="utf-8")
+
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(profile.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        # 計測側（cProfile・サンプラー・tracemalloc）の確保分は除く
+        filters = [tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)]
+        filters.append(tracemalloc.Filter(False, __file__))
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        lines = [f"# {name}: ステージ開始時からの増分（上位 {self.top}）"]
+        lines += [str(stat) for stat in diff[: self.top]]
+        Path(f"{base}.memory.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def write_summary(self) -> Optional[Path]:
+        if not self.enabled or not self.stages:
+            return None
+        path = self.output_dir / SUMMARY_NAME
+        summary = {"sampleIntervalSeconds": self.sample_interval, "stages": self.stages}
+        path.write_text(json.dumps(summary, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        logger.info(f"プロファイル結果: {self.output_dir}")
+        return path
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser, http: bool = True) -> None:
+    """--profile（と http=True なら --record-http / --replay-http）を追加する。"""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="DIR",
+        help="ステージごとの cProfile・スタック・メモリを書き出す（デフォルト: .cache/profile/<日時>）",
+    )
+    if not http:
+        return
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--record-http",
+        action="store_true",
+        help="HTTPレスポンスの本文をキャッシュに記録する（--replay-http 用）",
+    )
+    group.add_argument(
+        "--replay-http",
+        action="store_true",
+        help="記録済みのHTTPレスポンスだけを使い、通信しない",
+    )
+
+
+def profiler_from_args(args: argparse.Namespace) -> Profiler:
+    """add_profile_arguments の引数から Profiler を作り、HTTPのモードを設定する。"""
+    if getattr(args, "replay_http", False):
+        os.environ["VRC_HTTP_MODE"] = "replay"
+    elif getattr(args, "record_http", False):
+        os.environ["VRC_HTTP_MODE"] = "record"
+    if args.profile is None:
+        return Profiler()
+    output_dir = Path(args.profile) if args.profile else DEFAULT_PROFILE_ROOT / datetime.now().strftime("%Y%m%d-%H%M%S")
+    return Profiler(output_dir)
+
+
+def profile_main(main, name: str, description: str, http: bool = True) -> None:
+    """単独のスクレイパー用: CLI引数を読み、main() を1ステージとして実行する。"""
+    parser = argparse.ArgumentParser(description=description)
+    add_profile_arguments(parser, http=http)
+    profiler = profiler_from_args(parser.parse_args())
+    with profiler.stage(name):
+        main()
+    profiler.write_summary()
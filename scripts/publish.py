@@ -0,0 +1,223 @@
+"""
+公開用データの書き出し（publish ステージ）
+
+スクレイパーが書く docs/data/*.json（インデント付き）から、配信用のファイルを作る。
+
+    docs/data/dist/<name>.<hash>.json       空白なしの JSON（hash は内容の SHA-256 先頭12桁）
+    docs/data/dist/<name>.<hash>.json.gz    gzip 圧縮版（--precompress のときのみ）
+    docs/data/dist/<name>.<hash>.json.br    brotli 圧縮版（--precompress かつ brotli モジュールがある場合のみ）
+    docs/data/dist/manifest.json            論理名 → ファイル名 の対応表
+
+圧縮版は、事前圧縮したファイルをそのまま配信できるホストへデプロイするときだけ作る。
+GitHub Pages は配信時に自分で圧縮し、圧縮版を使わないので、リポジトリにはコミットしない
+（.gitignore 済み。毎日のコミットでバイナリが履歴に溜まるため）。
+
+ファイル名に内容のハッシュが入るため、クライアントはハッシュ付きファイルを
+immutable としてキャッシュでき、manifest.json だけを毎回取得すればよい。
+内容が変わっていないファイルは同じ名前のまま書き直さない。
+直前の manifest が参照していたファイルは、配信中のクライアントのために1世代残す。
+
+Usage:
+    python scripts/publish.py
+    python scripts/publish.py --data-dir docs/data
+    python scripts/publish.py --precompress    # デプロイ用に .gz / .br も作る
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # 任意依存。無ければ .br を作らない
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / "docs" / "data"
+DIST_DIR_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# 論理名 → docs/data 内の元ファイル
+ARTIFACTS = {
+    "items": "items.json",
+    # 前回の items.json からの差分（items_delta 参照）
+    "itemsDelta": "items.delta.json",
+    "worlds": "worlds.json",
+    "knowledge": "knowledge.json",
+    "trends": "trends.json",
+}
+
+HASH_LENGTH = 12
+
+
+def load_json(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def minify(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def publish_artifact(name: str, source: Path, dist_dir: Path, precompress: bool = False) -> dict:
+    """1ファイルを minify（precompress なら圧縮版も）してハッシュ付きの名前で書き、manifest のエントリを返す。"""
+    document = load_json(source)
+    data = minify(document)
+    digest = hashlib.sha256(data).hexdigest()
+    filename = f"{name}.{digest[:HASH_LENGTH]}.json"
+    path = dist_dir / filename
+
+    entry = {
+        "file": f"{DIST_DIR_NAME}/{filename}",
+        "source": source.name,
+        "sha256": digest,
+        "bytes": len(data),
+    }
+    if isinstance(document, dict) and "lastUpdated" in document:
+        # シャードなど同じ実行で書かれた他のファイルと突き合わせるため
+        entry["lastUpdated"] = document["lastUpdated"]
+    del document
+
+    variants = [(path, lambda: data)]
+    if precompress:
+        # mtime=0 で、同じ内容なら同じ .gz になるようにする
+        variants.append((path.with_name(filename + ".gz"), lambda: gzip.compress(data, compresslevel=9, mtime=0)))
+        if brotli is not None:
+            variants.append((path.with_name(filename + ".br"), lambda: brotli.compress(data, quality=11)))
+
+    written = False
+    for variant_path, encode in variants:
+        if variant_path.exists():
+            # ハッシュが同じなら中身も同じなので作り直さない
+            encoded_size = variant_path.stat().st_size
+        else:
+            encoded = encode()
+            _write_atomic(variant_path, encoded)
+            encoded_size = len(encoded)
+            written = True
+        suffix = variant_path.suffix
+        if suffix == ".gz":
+            entry["gzip"] = {"file": f"{DIST_DIR_NAME}/{variant_path.name}", "bytes": encoded_size}
+        elif suffix == ".br":
+            entry["br"] = {"file": f"{DIST_DIR_NAME}/{variant_path.name}", "bytes": encoded_size}
+
+    logger.info(
+        f"  {name}: {source.stat().st_size / 1024:.0f} KiB → {len(data) / 1024:.0f} KiB"
+        + (f" (gzip {entry['gzip']['bytes'] / 1024:.0f} KiB)" if "gzip" in entry else "")
+        + ("" if written else " [変更なし]")
+    )
+    return entry
+
+
+def _manifest_files(manifest: dict) -> set[str]:
+    files = set()
+    for entry in manifest.get("files", {}).values():
+        files.add(Path(entry["file"]).name)
+        for variant in ("gzip", "br"):
+            if variant in entry:
+                files.add(Path(entry[variant]["file"]).name)
+    return files
+
+
+def _load_manifest(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def publish(
+    data_dir: Path = DEFAULT_DATA_DIR,
+    artifacts: Optional[dict[str, str]] = None,
+    precompress: bool = False,
+) -> dict:
+    """
+    publish ステージを実行し、書き出した manifest を返す。
+
+    元ファイルが無い成果物は、前回の manifest のエントリを引き継ぐ（ファイルが残っていれば）。
+    precompress なら .gz / .br も作る（デプロイ用。コミットはしない）。
+    """
+    data_dir = Path(data_dir)
+    dist_dir = data_dir / DIST_DIR_NAME
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = dist_dir / MANIFEST_NAME
+    previous = _load_manifest(manifest_path) or {}
+
+    logger.info("公開用データを書き出します")
+    files = {}
+    for name, source_name in (artifacts or ARTIFACTS).items():
+        source = data_dir / source_name
+        if source.exists():
+            files[name] = publish_artifact(name, source, dist_dir, precompress=precompress)
+            continue
+        old = previous.get("files", {}).get(name)
+        if old and (data_dir / old["file"]).exists():
+            logger.warning(f"  {name}: {source_name} が無いため前回の公開ファイルを引き継ぎます")
+            files[name] = old
+        else:
+            logger.warning(f"  {name}: {source_name} が無いためスキップします")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "files": files,
+    }
+    if previous.get("files") == files:
+        # 内容が同じなら manifest も書き換えない（不要なコミットを出さない）
+        logger.info("  manifest: 変更なし")
+        return previous
+
+    _write_atomic(manifest_path, (json.dumps(manifest, ensure_ascii=False, indent=2) + "\n").encode("utf-8"))
+
+    # 今回と前回の manifest が参照していないハッシュ付きファイルを消す
+    keep = _manifest_files(manifest) | _manifest_files(previous) | {MANIFEST_NAME}
+    removed = 0
+    for path in dist_dir.iterdir():
+        if path.is_file() and path.name not in keep and not path.name.endswith(".tmp"):
+            path.unlink()
+            removed += 1
+    logger.info(f"  manifest: {len(files)} ファイル / 古いファイル削除 {removed}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRC-LIFE Portal 公開用データの書き出し")
+    parser.add_argument(
+        "--data-dir",
+        type=str,
+        default=str(DEFAULT_DATA_DIR),
+        help="元データのディレクトリ（デフォルト: docs/data）",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="gzip / brotli 版も書き出す（事前圧縮ファイルを配信できるホストへのデプロイ用）",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    if args.precompress and brotli is None:
+        logger.warning("brotli モジュールが無いため .br は作成しません")
+    publish(Path(args.data_dir), precompress=args.precompress)
+
+
+if __name__ == "__main__":
+    main()
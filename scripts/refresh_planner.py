@@ -0,0 +1,95 @@
+"""
+差分更新プランナー
+
+既存アイテムの fetchedAt を見て、今回の実行で再取得するURLを決める。
+
+- 新規URL（items.json に無い）: 必ず取得
+- 最終取得から FRESH_FOR 以内: 再取得しない
+- それ以外（stale）: 最終取得が古い順に、1回あたり MAX_REVALIDATIONS 件まで再取得
+
+再取得したアイテムは fetchedAt が新しくなって列の末尾に回るため、
+カタログ全体が ceil(件数 / MAX_REVALIDATIONS) 回の実行で一巡する。
+1回あたりの取得件数は「新規件数 + MAX_REVALIDATIONS」で頭打ちになり、
+カタログが増えても線形には増えない。
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 取得からこの期間内のアイテムは再取得しない
+FRESH_FOR = timedelta(days=3)
+# 1回の実行で再取得する既存アイテムの上限（None で無制限）
+MAX_REVALIDATIONS = 200
+
+
+def _parse_fetched_at(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def plan_refresh(
+    targets: list[dict],
+    existing_by_url: dict[str, dict],
+    now: Optional[datetime] = None,
+    fresh_for: timedelta = FRESH_FOR,
+    max_revalidations: Optional[int] = MAX_REVALIDATIONS,
+) -> set[str]:
+    """
+    今回取得すべきURLの集合を返す。
+
+    Args:
+        targets: fetch_csv_urls() の結果（"url" を持つ dict のリスト）
+        existing_by_url: boothUrl → 既存アイテム
+        now: 基準時刻（テスト用、デフォルトは現在時刻）
+        fresh_for: 再取得不要とみなす期間
+        max_revalidations: 既存アイテムの再取得上限（None で stale 全件）
+
+    Returns:
+        取得対象URLの集合（含まれないURLは既存データを流用する）
+    """
+    now = now or datetime.now(timezone.utc)
+    # fetchedAt が読めないものは最も古い扱い
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+
+    fetch_urls = set()
+    stale = []
+    new_count = 0
+    fresh_count = 0
+
+    for target in targets:
+        url = target["url"]
+        existing = existing_by_url.get(url)
+        if existing is None:
+            fetch_urls.add(url)
+            new_count += 1
+            continue
+
+        fetched_at = _parse_fetched_at(existing.get("fetchedAt")) or oldest
+        if now - fetched_at < fresh_for:
+            fresh_count += 1
+            continue
+        stale.append((fetched_at, url))
+
+    stale.sort()
+    if max_revalidations is not None:
+        deferred = stale[max_revalidations:]
+        stale = stale[:max_revalidations]
+    else:
+        deferred = []
+    fetch_urls.update(url for _, url in stale)
+
+    logger.info(
+        f"更新プラン: 新規 {new_count} / 再取得 {len(stale)} / "
+        f"新鮮(スキップ) {fresh_count} / 次回以降 {len(deferred)}"
+    )
+    return fetch_urls
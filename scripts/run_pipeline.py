@@ -4,112 +4,332 @@ BOOTH→VRC-LIFE Portal パイプライン統合スクリプト
 1. BOOTHからVRChat関連アイテムを収集
 2. R18/人気度フィルタリング
 3. ルールベースAIタグ付け
-4. items.json に出力
+4. items.json とページ別のシャード（shards/）に出力
+5. 各段階の所要時間・HTTP統計を run-report.json に出力（run_report 参照）
+
+全アイテムの正本は items.json と同じ場所の items.sqlite（catalog_db 参照）。
+items.json・シャード・items.ndjson（コミットするスナップショット）は
+そこから毎回書き出す。前回の items.json からの差分は items.delta.json
+（items_delta 参照）。
 
 Usage:
     python scripts/run_pipeline.py              # 通常実行
     python scripts/run_pipeline.py --dry-run    # ドライラン（HTTP通信なし）
+    python scripts/run_pipeline.py --resume     # 前回中断した収集の続きから（scrape_journal 参照）
+    python scripts/run_pipeline.py --dry-run --profile --tag-workers 1
+                                                # 収集・タグ付けのプロファイル（profiler 参照）
+    python scripts/run_pipeline.py --full-refresh --record-http   # 通信を記録
+    python scripts/run_pipeline.py --full-refresh --replay-http --profile
+                                                # 記録した通信でオフラインに再実行して計測
 """
 
-import json
 import sys
 import os
 import argparse
+import heapq
+import json
 import logging
-from datetime import datetime, timezone
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Union
 
 # scriptsディレクトリをパスに追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from booth_scraper import scrape_booth
-from auto_tagger import tag_all_items
+from booth_scraper import DETAIL_PARSER_VERSION, scrape_booth
+from auto_tagger import RULESET_VERSION, log_tag_stats, merge_tag_stats, tag_items, tag_pool
+from catalog_db import CatalogDB
+from catalog_store import write_items_json
+from item_record import MISSING, ItemRecord
+from items_delta import content_hash, delta_path_for, read_last_updated, write_delta
+from profiler import Profiler, add_profile_arguments, profiler_from_args
+from refresh_planner import FRESH_FOR, MAX_REVALIDATIONS
+from run_report import DEFAULT_REPORT_PATH, get_report
+from scrape_journal import DEFAULT_JOURNAL_PATH, ScrapeJournal
+from shards import ShardWriter
+from tag_cache import TagCache, get_default_tag_cache
 
 logger = logging.getLogger(__name__)
 
+# カタログをストリーミングでマージするときの1バッチの件数
+MERGE_BATCH_SIZE = 5000
 
-def run_pipeline(dry_run: bool = False, output_path: str = None) -> None:
-    """パイプラインを実行し items.json を生成する。"""
 
-    logger.info("=" * 60)
-    logger.info("VRC-LIFE Portal Fashion パイプライン")
-    logger.info(f"実行日時: {datetime.now(timezone.utc).isoformat()}")
-    logger.info(f"モード: {'ドライラン' if dry_run else '本番'}")
-    logger.info("=" * 60)
+def _id_sort_key(item_id: str) -> int:
+    return int(item_id.replace("booth-", ""))
 
-    # 出力パスの決定
-    if output_path is None:
-        project_root = Path(__file__).parent.parent
-        output_path = project_root / "docs" / "data" / "items.json"
-    else:
-        output_path = Path(output_path)
 
-    # Step 1: スクレイピング (フィルタリング込み)
-    # Step 1: スクレイピング (CSV Based)
-    logger.info(f"\n[Step 1/2] BOOTHからアイテム収集 (CSV List)...")
-    
-    # 既存データの読み込み (Incremental Update)
-    existing_items = []
-    if output_path.exists():
-        try:
-            with open(output_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                existing_items = data.get("items", [])
-            logger.info(f"  既存データ読み込み: {len(existing_items)} アイテム")
-        except Exception as e:
-            logger.warning(f"  既存データの読み込みに失敗 (新規作成します): {e}")
+def published_order(store: CatalogDB, new_by_id: dict[str, ItemRecord]) -> list[str]:
+    """
+    items.json の並び順のID一覧。ID（実質的な投稿順）の降順。
 
-    # IDマップ作成
-    item_map = {item["id"]: item for item in existing_items}
+    カタログの分は索引から並んだ順に読み、新規分だけを並べてマージする。
+    """
+    new_ids = [item_id for item_id in new_by_id if item_id not in store]
+    try:
+        new_ids.sort(key=_id_sort_key, reverse=True)
+        return list(heapq.merge(store.ids(), new_ids, key=_id_sort_key, reverse=True))
+    except Exception as e:
+        logger.warning(f"IDソートに失敗しました（likes順にフォールバックします）: {e}")
+        ids = store.ids() + new_ids
+        return sorted(
+            ids,
+            key=lambda item_id: (new_by_id.get(item_id) or store.get(item_id)).get("likes", 0),
+            reverse=True,
+        )
 
-    # 新規スクレイピング
-    new_items = scrape_booth(min_likes=0, dry_run=dry_run)
-    logger.info(f"  → 新規取得: {len(new_items)} アイテム")
 
-    # マージ (上書き更新)
+def merge_catalog(
+    store: CatalogDB,
+    new_items: Iterable[Union[dict, ItemRecord]],
+    output_path: Path,
+    tag_workers: int = None,
+    tag_cache: TagCache = None,
+    batch_size: int = MERGE_BATCH_SIZE,
+    write_shards: bool = True,
+) -> int:
+    """
+    新規取得分をカタログにマージし、タグ付けしながら items.json を書き出す。
+
+    カタログを公開順に batch_size 件ずつ読み、新規取得分で上書き→タグ付け→
+    items.json へ書き出し、内容が変わったアイテムだけをバッチごとに1トランザクションで
+    カタログに upsert する。最後に前回の items.json からの差分（items.delta.json）と
+    カタログのスナップショット（items.ndjson）を書き出す。
+    メモリに載るのは新規取得分（ItemRecord）・ID一覧・1バッチ分だけ。
+    write_shards=True なら同じパスでフロントエンド用のシャード（shards.py）も書く。
+
+    Returns:
+        書き出したアイテム数
+    """
+    new_by_id: dict[str, ItemRecord] = {}
     for item in new_items:
+        record = ItemRecord.coerce(item)
         # R18フラグなどの掃除
-        if "isR18" in item:
-            del item["isR18"]
-        item_map[item["id"]] = item
+        record.is_r18 = MISSING
+        new_by_id[record.id] = record
 
-    merged_items = list(item_map.values())
-    logger.info(f"  → マージ後合計: {len(merged_items)} アイテム")
+    order = published_order(store, new_by_id)
+    logger.info(f"  → マージ後合計: {len(order)} アイテム")
 
-    # Step 2: タグ付け
-    logger.info("\n[Step 2/2] 自動タグ付け...")
-    tagged_items = tag_all_items(merged_items)
-    logger.info(f"  → {len(tagged_items)} アイテムにタグ付与")
+    stats = {}
+    upserted = 0
+    last_updated = datetime.now(timezone.utc).isoformat()
+    shard_writer = ShardWriter(output_path.parent, last_updated, items_name=output_path.name) if write_shards else None
+
+    report = get_report()
+
+    previous_last_updated = store.published_last_updated()
+    if previous_last_updated is None:
+        # 差分の起点が無い（初回・カタログを作り直した・ハッシュの計算方法が変わった）:
+        # 今のカタログを前回の items.json とみなす
+        previous_last_updated = read_last_updated(output_path)
+        with report.timer("write_delta"):
+            store.reset_published(previous_last_updated)
+    store.start_publish()
+
+    def merged_items(pool):
+        nonlocal upserted
+        for start in range(0, len(order), batch_size):
+            batch = []
+            stored = []
+            with report.timer("catalog_read"):
+                batch_ids = order[start:start + batch_size]
+                stored_by_id = store.get_many(batch_ids)
+                for item_id in batch_ids:
+                    stored_item = stored_by_id.get(item_id)
+                    record = new_by_id.get(item_id)
+                    # タグ付けは dict を書き換えるので、どちらもここで新しい dict にする
+                    batch.append(record.to_dict() if record is not None else dict(stored_item))
+                    stored.append(stored_item)
+            merge_tag_stats(stats, tag_items(batch, workers=tag_workers, cache=tag_cache, pool=pool))
+            with report.timer("catalog_upsert"):
+                upserted += store.upsert(item for item, before in zip(batch, stored) if item != before)
+            with report.timer("write_delta"):
+                store.add_published((item["id"], content_hash(item), item.get("fetchedAt")) for item in batch)
+            if shard_writer is not None:
+                with report.timer("write_shards"):
+                    for item in batch:
+                        shard_writer.add(item)
+            yield from batch
+
+    # プロセスプールはマージ全体で1つ（バッチごとに起動しない）
+    with tag_pool(tag_workers) as pool:
+        count = write_items_json(merged_items(pool), output_path, total=len(order), last_updated=last_updated)
+    if shard_writer is not None:
+        with report.timer("write_shards"):
+            shard_writer.close()
+    report.count("items_written", count)
+    report.count("items_upserted", upserted)
+    log_tag_stats(count, stats)
+    logger.info(f"  カタログ更新: {upserted} アイテム ({store.path.name})")
+
+    with report.timer("write_delta"):
+        added, changed, removed, fetched_at = store.commit_publish(last_updated)
+        summary = write_delta(
+            delta_path_for(output_path),
+            previous_last_updated or None,
+            last_updated,
+            count,
+            added,
+            changed,
+            removed,
+            fetched_at,
+            store.get_many([*added, *changed]),
+        )
+    logger.info(
+        f"  差分: 追加 {summary['added']} / 変更 {summary['changed']} / 削除 {summary['removed']}"
+        f" / fetchedAt のみ {summary['fetchedAt']}"
+    )
+
+    with report.timer("export_ndjson"):
+        store.export_ndjson(output_path.with_suffix(".ndjson"))
+    return count
+
+
+def open_catalog(output_path: Path) -> CatalogDB:
+    """
+    items.json と同じ場所の items.sqlite を開く。
 
-    # ID（実質的な投稿順）でソート（降順）
+    items.ndjson（スナップショット）が前回書き出したものと違えばそこから作り直し、
+    どちらも無ければ既存の items.json から作る。
+    """
+    store = CatalogDB(output_path.with_suffix(".sqlite"))
     try:
-        tagged_items.sort(key=lambda x: int(x["id"].replace("booth-", "")), reverse=True)
+        store.load_snapshot(output_path.with_suffix(".ndjson"))
+        if not len(store) and output_path.exists():
+            with open(output_path, "r", encoding="utf-8") as f:
+                count = store.upsert(json.load(f).get("items", []))
+            logger.info(f"  {output_path.name} からカタログを作成: {count} アイテム")
     except Exception as e:
-        logger.warning(f"IDソートに失敗しました（likes順にフォールバックします）: {e}")
-        tagged_items.sort(key=lambda x: x.get("likes", 0), reverse=True)
+        logger.warning(f"  既存データの読み込みに失敗 (新規作成します): {e}")
+    logger.info(f"  既存データ読み込み: {len(store)} アイテム")
+    return store
+
+
+def collect_items(
+    store: CatalogDB,
+    dry_run: bool = False,
+    max_workers: int = None,
+    full_refresh: bool = False,
+    fresh_for: timedelta = FRESH_FOR,
+    max_revalidations: int = MAX_REVALIDATIONS,
+    resume: bool = False,
+) -> list[ItemRecord]:
+    """
+    BOOTHからアイテムを収集する（カタログの fetchedAt に基づく差分更新）。
+
+    結果はタグ付けまでメモリに持つので、軽量な ItemRecord で返す。
+
+    取得したアイテムは booth_journal() に記録する。resume=True なら前回中断した
+    収集のジャーナルにあるURLは取得しない。収集結果を保存したら呼び出し側で
+    booth_journal().clear() する。
+    """
+    scrape_kwargs = {"max_workers": max_workers} if max_workers else {}
+    if not dry_run:
+        scrape_kwargs.update(journal=booth_journal(), resume=resume)
+    if not full_refresh:
+        scrape_kwargs.update(
+            existing_by_url=store.by_url(),
+            fresh_for=fresh_for,
+            max_revalidations=max_revalidations,
+        )
+    new_items = [ItemRecord.from_dict(item) for item in scrape_booth(min_likes=0, dry_run=dry_run, **scrape_kwargs)]
+    logger.info(f"  → 新規取得: {len(new_items)} アイテム")
+    return new_items
+
+
+def booth_journal() -> ScrapeJournal:
+    """BOOTH 収集のジャーナル。"""
+    return ScrapeJournal(DEFAULT_JOURNAL_PATH, parser_version=DETAIL_PARSER_VERSION)
 
-    # 出力データ構築
-    output_data = {
-        "lastUpdated": datetime.now(timezone.utc).isoformat(),
-        "totalItems": len(tagged_items),
-        "items": tagged_items,
-    }
 
-    # 空の結果だった場合は出力しない（既存データを保護）
-    if not tagged_items:
+def build_catalog(
+    store: CatalogDB,
+    new_items: Iterable[Union[dict, ItemRecord]],
+    output_path: Path,
+    dry_run: bool = False,
+    tag_workers: int = None,
+) -> int:
+    """収集結果をカタログにマージしてタグ付けし、items.json とシャードを書き出す。"""
+    # 名前・説明文・手動指定が前回と同じアイテムはタグ付け結果を再利用する
+    tag_cache = None if dry_run else get_default_tag_cache(RULESET_VERSION)
+
+    with store:
+        # マージ・タグ付け・ID降順での items.json 出力を1パスで行う
+        total = merge_catalog(store, new_items, output_path, tag_workers=tag_workers, tag_cache=tag_cache)
+    if tag_cache is not None:
+        tag_cache.save()
+
+    # 空の結果だった場合
+    if not total:
         logger.error("❌ エラー: アイテムが0件です。")
-        # 既存データがあるならエラーにしない選択肢もあるが、
-        # スクレイピング失敗で0件になった場合は更新したくないのでExit
-        pass 
-        # Note: Merged items implies we have existing items, so this check is valid for empty merge result.
+    return total
+
+
+def default_output_path() -> Path:
+    return Path(__file__).parent.parent / "docs" / "data" / "items.json"
+
+
+def run_pipeline(
+    dry_run: bool = False,
+    output_path: str = None,
+    max_workers: int = None,
+    full_refresh: bool = False,
+    fresh_for: timedelta = FRESH_FOR,
+    max_revalidations: int = MAX_REVALIDATIONS,
+    tag_workers: int = None,
+    profiler: Profiler = None,
+    resume: bool = False,
+) -> None:
+    """パイプラインを実行し items.json を生成する。
+
+    full_refresh=False の場合は既存アイテムの fetchedAt に基づく差分更新
+    （refresh_planner 参照）。True ならシートの全URLを取得し直す。
+    profiler を渡すと収集（collect）とタグ付け（tag）をそれぞれ計測する。
+    resume=True なら前回中断した収集の続きから始める。
+    """
+    profiler = profiler or Profiler()
+
+    logger.info("=" * 60)
+    logger.info("VRC-LIFE Portal Fashion パイプライン")
+    logger.info(f"実行日時: {datetime.now(timezone.utc).isoformat()}")
+    logger.info(f"モード: {'ドライラン' if dry_run else '本番'}")
+    logger.info("=" * 60)
+
+    # 出力パスの決定
+    output_path = default_output_path() if output_path is None else Path(output_path)
+
+    # Step 1: スクレイピング (CSV Based)
+    logger.info(f"\n[Step 1/2] BOOTHからアイテム収集 (CSV List)...")
+    # 正本は items.json と同じ場所の items.ndjson（差分更新の基準）
+    store = open_catalog(output_path)
+    with profiler.stage("collect"):
+        new_items = collect_items(
+            store,
+            dry_run=dry_run,
+            max_workers=max_workers,
+            full_refresh=full_refresh,
+            fresh_for=fresh_for,
+            max_revalidations=max_revalidations,
+            resume=resume,
+        )
+
+    # Step 2: タグ付け
+    logger.info("\n[Step 2/2] 自動タグ付け...")
+    with profiler.stage("tag"):
+        total = build_catalog(store, new_items, output_path, dry_run=dry_run, tag_workers=tag_workers)
+    if not dry_run:
+        # 収集結果はカタログに入ったので、再開用の記録は不要
+        booth_journal().clear()
 
-    # JSON出力
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    report_path = DEFAULT_REPORT_PATH
+    get_report().write(report_path)
+    profiler.write_summary()
 
     logger.info(f"\n{'=' * 60}")
-    logger.info(f"✅ 完了: {len(tagged_items)} アイテムを {output_path} に出力")
+    logger.info(f"✅ 完了: {total} アイテムを {output_path} に出力")
+    logger.info(f"   実行レポート: {report_path}")
     logger.info(f"{'=' * 60}")
 
 
@@ -126,6 +346,41 @@ def main():
         default=None,
         help="出力ファイルパス（デフォルト: data/items.json）",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="BOOTH取得の並行ワーカー数（リクエスト間隔はホスト単位で維持）",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="差分更新せず、シートの全URLを再取得する",
+    )
+    parser.add_argument(
+        "--fresh-days",
+        type=float,
+        default=FRESH_FOR.total_seconds() / 86400,
+        help="最終取得からこの日数以内のアイテムは再取得しない",
+    )
+    parser.add_argument(
+        "--max-revalidations",
+        type=int,
+        default=MAX_REVALIDATIONS,
+        help="1回の実行で再取得する既存アイテムの上限",
+    )
+    parser.add_argument(
+        "--tag-workers",
+        type=int,
+        default=None,
+        help="タグ付けのプロセス数（デフォルト: CPU数、件数が少なければ単一プロセス）",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="前回中断した収集の続きから（取得済みのURLは取得しない）",
+    )
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -134,7 +389,17 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    run_pipeline(dry_run=args.dry_run, output_path=args.output)
+    run_pipeline(
+        dry_run=args.dry_run,
+        output_path=args.output,
+        max_workers=args.workers,
+        full_refresh=args.full_refresh,
+        fresh_for=timedelta(days=args.fresh_days),
+        max_revalidations=args.max_revalidations,
+        tag_workers=args.tag_workers,
+        profiler=profiler_from_args(args),
+        resume=args.resume,
+    )
 
 
 if __name__ == "__main__":
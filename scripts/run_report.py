@@ -0,0 +1,189 @@
+"""
+実行レポート（ステージごとの所要時間・スループット）
+
+パイプラインの各段階の実時間・CPU時間と、HTTPリクエストのホストごとの件数・
+ステータス・転送量・レイテンシを集計し、.cache/run-report.json に書き出す。
+日々の実行時間がどこに使われているか、遅くなっていないかを機械的に追えるようにするためのもの。
+公開するデータ（docs/data）には含めず、CI ではワークフローの成果物として残す。
+
+集計はプロセス共通の get_report() に対して行う（複数スレッドから呼んでよい）。
+
+    @timed("fetch_html")            関数の呼び出しごとに時間を加算
+    with get_report().timer("x"):   任意の区間
+    get_report().record_request(...) http_client.HttpClient が全リクエストで呼ぶ
+
+時間は包含的（入れ子の区間はそれぞれに計上される）。
+CPU時間は呼び出したスレッドの分（time.thread_time）で、ワーカースレッドや
+子プロセスの分はレポート末尾のプロセス全体の値（getrusage）で見る。
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from throttle import default_host_key
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_REPORT_PATH = Path(__file__).resolve().parent.parent / ".cache" / "run-report.json"
+REPORT_VERSION = 1
+
+# レイテンシの集計で出すパーセンタイル
+PERCENTILES = (50, 90, 99)
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    """最近傍順位法のパーセンタイル。"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class RunReport:
+    """1回の実行分の計測値。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+            self._stages: dict[str, dict] = {}
+            self._counters: dict[str, int] = {}
+            self._hosts: dict[str, dict] = {}
+
+    # --- 計測 ---
+
+    def add_time(self, name: str, wall: float, cpu: float = 0.0, calls: int = 1) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {"calls": 0, "wall": 0.0, "cpu": 0.0}
+            stage["calls"] += calls
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record_request(self, url: str, status: int, latency: float, nbytes: int) -> None:
+        """1リクエストの結果（latency はレスポンスヘッダーまでの秒数、nbytes は受信バイト数）。"""
+        host = default_host_key(url)
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {"requests": 0, "bytes": 0, "byStatus": {}, "latencies": []}
+            stats["requests"] += 1
+            stats["bytes"] += nbytes
+            key = str(status)
+            stats["byStatus"][key] = stats["byStatus"].get(key, 0) + 1
+            stats["latencies"].append(latency)
+
+    # --- 出力 ---
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {
+                    "calls": stage["calls"],
+                    "wallSeconds": round(stage["wall"], 3),
+                    "cpuSeconds": round(stage["cpu"], 3),
+                }
+                for name, stage in self._stages.items()
+            }
+            hosts = {}
+            total_status: dict[str, int] = {}
+            for host, stats in sorted(self._hosts.items()):
+                latencies = sorted(stats["latencies"])
+                hosts[host] = {
+                    "requests": stats["requests"],
+                    "bytes": stats["bytes"],
+                    "byStatus": dict(sorted(stats["byStatus"].items())),
+                    "latencyMs": {
+                        **{f"p{p}": round(_percentile(latencies, p) * 1000, 1) for p in PERCENTILES},
+                        "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                    },
+                }
+                for status, n in stats["byStatus"].items():
+                    total_status[status] = total_status.get(status, 0) + n
+            counters = dict(self._counters)
+            started_at = self.started_at
+            wall = time.perf_counter() - self._started
+
+        report = {
+            "version": REPORT_VERSION,
+            "startedAt": started_at.isoformat(),
+            "finishedAt": datetime.now(timezone.utc).isoformat(),
+            "wallSeconds": round(wall, 3),
+            "stages": stages,
+            "counters": counters,
+            "http": {
+                "requests": sum(h["requests"] for h in hosts.values()),
+                "bytes": sum(h["bytes"] for h in hosts.values()),
+                "byStatus": dict(sorted(total_status.items())),
+                "hosts": hosts,
+            },
+        }
+        if resource is not None:
+            own = resource.getrusage(resource.RUSAGE_SELF)
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            report["process"] = {
+                "userSeconds": round(own.ru_utime, 3),
+                "systemSeconds": round(own.ru_stime, 3),
+                "childrenUserSeconds": round(children.ru_utime, 3),
+                "childrenSystemSeconds": round(children.ru_stime, 3),
+                # Linux では KiB 単位
+                "maxRssMiB": round(own.ru_maxrss / 1024, 1),
+            }
+        return report
+
+    def write(self, path: Path) -> dict:
+        report = self.to_dict()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+        return report
+
+
+_default_report = RunReport()
+
+
+def get_report() -> RunReport:
+    """プロセス共通のレポートを返す。"""
+    return _default_report
+
+
+def timed(name: str) -> Callable:
+    """関数の呼び出しごとの時間を get_report() に加算するデコレータ。"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _default_report.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -0,0 +1,333 @@
+"""
+VRC-LIFE Portal データ更新の統合ランナー
+
+全データの更新をステージに分け、依存関係に従って実行する。
+
+    booth      BOOTHからアイテム収集（run_pipeline.collect_items）
+    world      WORLD シート → worlds.json（scraper_world）
+    knowledge  KNOWLEDGE シート → knowledge.json（scraper_knowledge）
+    trend      RSS + Gemini → trends.json（scraper_trend）
+    tag        カタログへのマージ・タグ付け → items.json / shards（booth の後）
+    publish    公開用ファイルの書き出し（publish.py、他の全ステージの後）
+
+依存関係のないステージは並行に実行するので、全体の所要時間は
+各ソースの合計ではなく、最も遅いソースの分だけになる。
+
+入力ファイルを持つステージ（tag, publish）は、入力のハッシュと前回実行後の
+出力のハッシュを .cache/stages.json に記録し、どちらも変わっていなければスキップする。
+外部ソースのステージは毎回取得し（HTTPキャッシュで 304 なら安い）、
+結果が変わらなければ下流のステージがスキップされる。
+
+各ステージの所要時間は .cache/run-report.json（run_report 参照）に書き出す。
+
+Usage:
+    python scripts/run_stages.py                     # 全ステージ
+    python scripts/run_stages.py --only booth tag    # 指定したステージだけ
+    python scripts/run_stages.py --skip trend        # 指定したステージ以外
+    python scripts/run_stages.py --dry-run           # BOOTHはサンプルデータ、外部ソースは実行しない
+    python scripts/run_stages.py --force             # ハッシュによるスキップをしない
+    python scripts/run_stages.py --resume            # 前回中断したBOOTH収集の続きから
+    python scripts/run_stages.py --dry-run --replay-http --profile --force
+                                                     # 記録済みの通信で全ステージを1つずつ計測（profiler 参照）
+"""
+
+import sys
+import os
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Optional
+
+# scriptsディレクトリをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from auto_tagger import RULESET_VERSION
+from profiler import Profiler, add_profile_arguments, profiler_from_args
+from publish import ARTIFACTS, MANIFEST_VERSION, publish
+from run_pipeline import booth_journal, build_catalog, collect_items, open_catalog
+from run_report import DEFAULT_REPORT_PATH, get_report
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_ROOT / "docs" / "data"
+ITEMS_PATH = DATA_DIR / "items.json"
+STATE_PATH = PROJECT_ROOT / ".cache" / "stages.json"
+# booth → tag の受け渡し（収集結果）
+BOOTH_ITEMS_PATH = PROJECT_ROOT / ".cache" / "stages" / "booth-items.json"
+
+# 外部ソースを取得するステージ（--dry-run では実行しない。booth はサンプルデータを使う）
+NETWORK_STAGES = ("world", "knowledge", "trend")
+
+_HASH_CHUNK = 1 << 20
+
+
+class Stage:
+    """
+    1ステージの定義。
+
+    Args:
+        name: ステージ名
+        run: 実行する関数（引数なし）
+        deps: 先に完了している必要があるステージ名
+        inputs: 入力ファイル。空なら外部ソースとみなし、毎回実行する
+        outputs: 出力ファイル（スキップ判定で、前回の出力から変わっていないことを確認する）
+        version: 入力以外で結果が変わる要因（ルールのバージョンなど）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], None],
+        deps: tuple[str, ...] = (),
+        inputs: tuple[Path, ...] = (),
+        outputs: tuple[Path, ...] = (),
+        version: str = "",
+    ):
+        self.name = name
+        self.run = run
+        self.deps = deps
+        self.inputs = inputs
+        self.outputs = outputs
+        self.version = version
+
+
+def hash_files(paths: tuple[Path, ...], version: str = "") -> str:
+    """ファイル群の内容のハッシュ。存在しないファイルもその旨を含めて区別する。"""
+    h = hashlib.sha256(version.encode("utf-8"))
+    for path in paths:
+        # 実行環境でルートの場所が変わってもハッシュが変わらないよう、相対パスで
+        name = path.relative_to(PROJECT_ROOT) if path.is_relative_to(PROJECT_ROOT) else path
+        h.update(b"\0" + str(name).encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                h.update(b"\1")
+                while chunk := f.read(_HASH_CHUNK):
+                    h.update(chunk)
+        except FileNotFoundError:
+            h.update(b"\2")
+    return h.hexdigest()
+
+
+def _load_state(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def run_stages(
+    stages: dict[str, Stage],
+    selected: list[str],
+    jobs: Optional[int] = None,
+    force: bool = False,
+    state_path: Path = STATE_PATH,
+    profiler: Optional[Profiler] = None,
+) -> dict[str, str]:
+    """
+    selected のステージを依存関係に従って並行実行し、ステージ名 → 結果 を返す。
+
+    結果は "ok" / "skipped"（入力・出力とも前回と同じ） / "failed" /
+    "cancelled"（依存先が失敗した）のいずれか。
+    selected に含まれない依存先は完了済みとして扱う。
+    profiler を渡すとステージごとに計測する（計測が混ざらないよう1つずつ実行する）。
+    """
+    profiler = profiler or Profiler()
+    if profiler.enabled:
+        jobs = 1
+    state = _load_state(state_path)
+    state_lock = threading.Lock()
+    results: dict[str, str] = {}
+    pending = [name for name in stages if name in selected]
+
+    def execute(stage: Stage) -> str:
+        threading.current_thread().name = stage.name
+        input_hash = hash_files(stage.inputs, stage.version) if stage.inputs else None
+        previous = state.get(stage.name, {})
+        if (
+            not force
+            and input_hash is not None
+            and previous.get("inputs") == input_hash
+            and previous.get("outputs") == hash_files(stage.outputs)
+        ):
+            logger.info(f"[{stage.name}] 入力・出力とも前回と同じためスキップ")
+            return "skipped"
+
+        logger.info(f"[{stage.name}] 開始")
+        started = time.monotonic()
+        with get_report().timer(f"stage:{stage.name}"), profiler.stage(stage.name):
+            stage.run()
+        elapsed = time.monotonic() - started
+        logger.info(f"[{stage.name}] 完了 ({elapsed:.1f}s)")
+        if input_hash is not None:
+            with state_lock:
+                state[stage.name] = {"inputs": input_hash, "outputs": hash_files(stage.outputs)}
+                _save_state(state_path, state)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=jobs or max(1, len(pending)), thread_name_prefix="stage") as executor:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                deps = [dep for dep in stages[name].deps if dep in selected]
+                if any(results.get(dep) in ("failed", "cancelled") for dep in deps):
+                    logger.warning(f"[{name}] 依存ステージが失敗したため実行しません")
+                    results[name] = "cancelled"
+                    pending.remove(name)
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(execute, stages[name])] = name
+                    pending.remove(name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.exception(f"[{name}] 失敗: {e}")
+                    results[name] = "failed"
+    return results
+
+
+def build_stages(args: argparse.Namespace) -> dict[str, Stage]:
+    """CLI引数から全ステージの定義を作る。"""
+
+    def run_booth():
+        store = open_catalog(ITEMS_PATH)
+        with store:
+            items = collect_items(
+                store,
+                dry_run=args.dry_run,
+                max_workers=args.workers,
+                full_refresh=args.full_refresh,
+                resume=args.resume,
+            )
+        BOOTH_ITEMS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = BOOTH_ITEMS_PATH.with_name(f"{BOOTH_ITEMS_PATH.name}.tmp")
+        data = [item.to_dict() for item in items]
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, BOOTH_ITEMS_PATH)
+        if not args.dry_run:
+            # 収集結果は受け渡しファイルに入ったので、再開用の記録は不要
+            booth_journal().clear()
+
+    def run_tag():
+        if not BOOTH_ITEMS_PATH.exists():
+            raise FileNotFoundError(f"{BOOTH_ITEMS_PATH} がありません。先に booth ステージを実行してください")
+        with open(BOOTH_ITEMS_PATH, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        build_catalog(open_catalog(ITEMS_PATH), items, ITEMS_PATH, dry_run=args.dry_run, tag_workers=args.tag_workers)
+
+    def run_world():
+        import scraper_world
+        scraper_world.main()
+
+    def run_knowledge():
+        import scraper_knowledge
+        scraper_knowledge.main()
+
+    def run_trend():
+        # google-generativeai は trend だけの依存なので、実行時に読み込む
+        import scraper_trend
+        scraper_trend.main()
+
+    def run_publish():
+        publish(DATA_DIR)
+
+    stages = [
+        Stage("booth", run_booth),
+        Stage("world", run_world, outputs=(DATA_DIR / "worlds.json",)),
+        Stage("knowledge", run_knowledge, outputs=(DATA_DIR / "knowledge.json",)),
+        Stage("trend", run_trend, outputs=(DATA_DIR / "trends.json",)),
+        Stage(
+            "tag",
+            run_tag,
+            deps=("booth",),
+            inputs=(BOOTH_ITEMS_PATH,),
+            outputs=(
+                ITEMS_PATH,
+                ITEMS_PATH.with_suffix(".ndjson"),
+                DATA_DIR / "items.delta.json",
+                DATA_DIR / "shards" / "manifest.json",
+            ),
+            version=RULESET_VERSION,
+        ),
+        Stage(
+            "publish",
+            run_publish,
+            deps=("tag", "world", "knowledge", "trend"),
+            inputs=tuple(DATA_DIR / name for name in ARTIFACTS.values()),
+            outputs=(DATA_DIR / "dist" / "manifest.json",),
+            version=str(MANIFEST_VERSION),
+        ),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VRC-LIFE Portal データ更新（全ステージ）")
+    parser.add_argument("--only", nargs="+", default=None, metavar="STAGE", help="実行するステージ")
+    parser.add_argument("--skip", nargs="+", default=[], metavar="STAGE", help="実行しないステージ")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="ドライラン（BOOTHはサンプルデータ、world/knowledge/trend は実行しない）",
+    )
+    parser.add_argument("--force", action="store_true", help="入力ハッシュによるスキップをしない")
+    parser.add_argument("--jobs", type=int, default=None, help="同時に実行するステージ数（デフォルト: 全て）")
+    parser.add_argument("--workers", type=int, default=None, help="BOOTH取得の並行ワーカー数")
+    parser.add_argument("--full-refresh", action="store_true", help="BOOTHの差分更新をせず全URLを再取得する")
+    parser.add_argument("--resume", action="store_true", help="前回中断したBOOTH収集の続きから")
+    parser.add_argument("--tag-workers", type=int, default=None, help="タグ付けのプロセス数")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s [%(threadName)s]: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    stages = build_stages(args)
+    unknown = set(args.only or ()) | set(args.skip)
+    unknown -= set(stages)
+    if unknown:
+        parser.error(f"不明なステージ: {', '.join(sorted(unknown))}（{', '.join(stages)}）")
+
+    selected = [name for name in (args.only or stages) if name not in args.skip]
+    if args.dry_run and not args.replay_http:
+        # 記録済みの通信を再生するなら、外部ソースのステージもオフラインで実行できる
+        selected = [name for name in selected if name not in NETWORK_STAGES]
+    profiler = profiler_from_args(args)
+
+    # 各スクレイパーの出力パスはリポジトリのルートからの相対パス
+    os.chdir(PROJECT_ROOT)
+    started = time.monotonic()
+    results = run_stages(stages, selected, jobs=args.jobs, force=args.force, profiler=profiler)
+
+    logger.info("=" * 60)
+    for name, result in results.items():
+        logger.info(f"  {name}: {result}")
+    logger.info(f"合計 {time.monotonic() - started:.1f}s")
+    get_report().write(DEFAULT_REPORT_PATH)
+    profiler.write_summary()
+    logger.info("=" * 60)
+    if any(result in ("failed", "cancelled") for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
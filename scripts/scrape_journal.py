@@ -0,0 +1,150 @@
+"""
+BOOTH 収集のチェックポイント（再開用ジャーナル）
+
+scrape_booth は取得・解析できたアイテムを1件ずつ .cache/booth-journal.ndjson に追記する。
+収集の途中でプロセスが落ちたりジョブが時間切れになったりしても、
+次の実行を --resume 付きで始めれば、ジャーナルにあるURLは取得せずにその結果を使う。
+
+    1行目   {"version": 1, "parser": <DETAIL_PARSER_VERSION>, "startedAt": ...}
+    2行目〜 {"url": ..., "item": {...}}
+
+行は書くたびに flush し（プロセスが落ちても残る）、CHECKPOINT_EVERY 件ごとに
+fsync する（マシンが落ちても残る）。取得に失敗したURLは書かないので、再開時に取り直す。
+収集結果がカタログ（または booth ステージの受け渡しファイル）に書かれたら clear() で消す。
+
+解析処理のバージョンが変わった、または MAX_AGE より古いジャーナルは再開に使わない。
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = Path(__file__).resolve().parent.parent / ".cache" / "booth-journal.ndjson"
+JOURNAL_VERSION = 1
+# この件数ごとに fsync する
+CHECKPOINT_EVERY = 25
+# これより古いジャーナルからは再開しない（内容が古くなっているため）
+MAX_AGE = timedelta(hours=24)
+
+
+class ScrapeJournal:
+    """
+    収集済みアイテムの追記専用ジャーナル。record() は複数スレッドから呼んでよい。
+
+    Args:
+        path: ジャーナルのパス
+        parser_version: 解析処理のバージョン（違うジャーナルからは再開しない）
+    """
+
+    def __init__(self, path: Path = DEFAULT_JOURNAL_PATH, parser_version: str = ""):
+        self.path = Path(path)
+        self.parser_version = parser_version
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, dict]:
+        """再開に使えるジャーナルの URL → アイテム を返す（使えなければ空）。"""
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return {}
+        items: dict[str, dict] = {}
+        with f:
+            try:
+                header = json.loads(f.readline())
+                if not isinstance(header, dict):
+                    raise ValueError(header)
+            except ValueError:
+                logger.warning(f"ジャーナルのヘッダーが読めないため再開しません: {self.path}")
+                return {}
+            if header.get("version") != JOURNAL_VERSION or header.get("parser") != self.parser_version:
+                logger.warning("解析処理のバージョンが違うため、ジャーナルからは再開しません")
+                return {}
+            try:
+                started_at = datetime.fromisoformat(header["startedAt"])
+                age = datetime.now(timezone.utc) - started_at
+            except (KeyError, TypeError, ValueError):
+                # 開始日時が無い・読めない（タイムゾーンが無いものも含む）ヘッダー
+                logger.warning(f"ジャーナルのヘッダーが読めないため再開しません: {self.path}")
+                return {}
+            if age > MAX_AGE:
+                logger.warning(f"ジャーナルが古いため再開しません（{started_at.isoformat()} 開始）")
+                return {}
+            for line in f:
+                if not line.endswith("}\n"):
+                    # 書き込み途中で落ちた最後の行
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                items[entry["url"]] = entry["item"]
+        logger.info(f"ジャーナルから再開: {len(items)} 件取得済み（{started_at.isoformat()} 開始）")
+        return items
+
+    def open(self, resume: bool = False) -> None:
+        """書き込みを始める。resume=False なら既存のジャーナルを捨てて新しく始める。"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                truncated = size > 0 and f.read(1) != b"\n"
+            self._file = open(self.path, "a", encoding="utf-8")
+            if truncated:
+                # 前回の書き込みが途中で切れていたら、その行とは別の行から書き始める
+                self._file.write("\n")
+            return
+        self._file = open(self.path, "w", encoding="utf-8")
+        header = {
+            "version": JOURNAL_VERSION,
+            "parser": self.parser_version,
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+        }
+        self._file.write(json.dumps(header) + "\n")
+        self._sync()
+
+    def record(self, url: str, item: dict) -> None:
+        """1件分を追記する。"""
+        line = json.dumps({"url": url, "item": item}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= CHECKPOINT_EVERY:
+                self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def clear(self) -> None:
+        """収集結果が保存されたので、ジャーナルを消す。"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "ScrapeJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -170,4 +170,6 @@ def main():
     logger.info(f"Saved. Added {added_count} new articles. Total: {len(final_data)}")
 
 if __name__ == "__main__":
-    main()
+    # --profile (see profiler.py); RSS and Gemini calls don't go through the HTTP cache
+    from profiler import profile_main
+    profile_main(main, "trend", description="Trend scraper for VRC-LIFE Portal", http=False)
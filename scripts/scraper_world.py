@@ -5,29 +5,27 @@ Syncs valid URLs from Sheet to worlds.json.
 Scrapes og:image from VRChat.com as auxiliary data.
 """
 
-import requests
 import csv
 import io
 import json
 import re
-import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Optional
 
+from http_cache import get_default_cache
+from sheet_source import WORKBOOK_URL, WORLD_GID, get_sheet_table, iter_table_rows, row_cell
+from run_report import timed
+from throttle import HostRateLimiter
+
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 # Constants
-# NOTE: This URL should point to the "WORLD" sheet CSV export.
-# If using "Publish to Web", ensure the GID matches the WORLD sheet.
-# For now, using the same base, User might need to update this or I will check if I can derive it.
-# Update URL to the specific sheet's pubhtml endpoint which returns a table
-# gid=162444085 is for the WORLD sheet
-# Update URL to the specific sheet's pubhtml endpoint which returns a table
-# gid=162444085 is for the WORLD sheet
-WORLD_SHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ98u4MEiJ3o8jesqRUMv7hrg8atUwxQoIggjMlRWlHFCeCNDCObcde1cjOVXKVW5BFscQe7Z5zsG2_/pubhtml/sheet?headers=false&gid=162444085"
+# The HTML mode reads the WORLD tab (sheet_source.WORLD_GID) from the shared
+# workbook download; the CSV export below is the fallback mode.
 WORLD_CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ98u4MEiJ3o8jesqRUMv7hrg8atUwxQoIggjMlRWlHFCeCNDCObcde1cjOVXKVW5BFscQe7Z5zsG2_/pub?gid=162444085&single=true&output=csv"
 
 # Configuration
@@ -62,7 +60,7 @@ def fetch_csv_data(csv_url: str) -> list[dict]:
     Fallback method.
     """
     try:
-        response = requests.get(csv_url)
+        response = get_default_cache().get(csv_url, timeout=30)
         response.encoding = 'utf-8'
         response.raise_for_status()
         
@@ -105,9 +103,10 @@ def fetch_csv_data(csv_url: str) -> list[dict]:
         logger.error(f"Failed to fetch CSV: {e}")
         return []
 
-def fetch_sheet_data(url: str) -> list[dict]:
+def fetch_sheet_data(gid: Optional[str] = WORLD_GID, url: str = WORKBOOK_URL) -> list[dict]:
     """
     Fetch and parse data from Google Sheets (HTML format).
+    The WORLD tab's table is taken from the shared workbook download (sheet_source).
     HTML Table Columns (based on inspection):
     0: Name
     1: URL (Link)
@@ -118,24 +117,11 @@ def fetch_sheet_data(url: str) -> list[dict]:
     6: Description
     """
     try:
-        logger.info(f"Fetching from {url}")
-        response = requests.get(url, headers=HEADERS)
-        response.encoding = 'utf-8'
-        response.raise_for_status()
-        
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # The table usually has class 'waffle'
-        table = soup.find('table', class_='waffle') or soup.find('table')
-        
-        if not table:
-            logger.error("No table found in Sheet HTML")
-            # Log snippet for debugging
-            logger.error(f"Response snippet: {response.text[:500]}")
+        table_html = get_sheet_table(gid=gid, url=url)
+        if not table_html:
+            logger.error(f"No table found in Sheet HTML (gid={gid})")
             return []
 
-        rows = table.find_all('tr')
         items = []
         
         # Skip header rows. 
@@ -143,48 +129,32 @@ def fetch_sheet_data(url: str) -> list[dict]:
         # In the sample: Row 0 is Headers. Row 1 is empty (shim). Row 2 is data.
         # We can iterate and check content.
         
-        for i, row in enumerate(rows):
-            cells = row.find_all('td')
-            if len(cells) < 3: # Need at least Name, URL, Category
+        for row in iter_table_rows(table_html):
+            if len(row) < 3: # Need at least Name, URL, Category
                 continue
-                
-            # Helper to get text safe
-            def get_cell(idx):
-                return cells[idx] if idx < len(cells) else None
-                
-            def get_text(idx):
-                c = get_cell(idx)
-                return c.get_text(strip=True) if c else ""
 
             # Check if this is a header row (heuristic: "ワールド名" in first cell)
-            first_text = get_text(0)
-            if "ワールド名" in first_text or not first_text:
+            world_name = row[0].text
+            if "ワールド名" in world_name or not world_name:
                 continue
 
-            world_name = get_text(0)
-            
             # URL is in cell 1 'a' tag
-            c1 = get_cell(1)
-            world_url_raw = c1.find('a')['href'] if c1 and c1.find('a') else get_text(1)
-            world_url = clean_google_url(world_url_raw)
+            url_cell = row[1]
+            world_url = clean_google_url(url_cell.link or url_cell.text)
 
             if not world_url.startswith("http"):
                 continue
 
-            category = get_text(2)
-            date_created = get_text(3)
+            category = row[2].text
+            date_created = row_cell(row, 3).text
             
             # Author: Cell 4
-            c4 = get_cell(4)
-            author = get_text(4)
-            author_url = ""
-            if c4:
-                link = c4.find('a')
-                if link and link.get('href'):
-                    author_url = clean_google_url(link.get('href'))
+            author_cell = row_cell(row, 4)
+            author = author_cell.text
+            author_url = clean_google_url(author_cell.link) if author_cell.link else ""
 
             # Skip cell 5 (Status)
-            description = get_text(6)
+            description = row_cell(row, 6).text
             
             # Custom Image: Not present in this HTML view, explicit empty
             custom_image_url = ""
@@ -205,33 +175,79 @@ def fetch_sheet_data(url: str) -> list[dict]:
         logger.error(f"Failed to fetch Sheet Data: {e}")
         return []
 
+# Bump when the og:image extraction below changes (invalidates cached results)
+IMAGE_PARSER_VERSION = "2"
+
+# Thumbnail resolution: parallel workers and minimum interval per host (seconds).
+# The interval matches the old 1s sleep between world pages, so vrchat.com sees the
+# same request rate; the workers only overlap response latency.
+IMAGE_WORKERS = 8
+IMAGE_REQUEST_INTERVAL = 1.0
+
+IMAGE_LIMITER = HostRateLimiter(interval=IMAGE_REQUEST_INTERVAL)
+
+_OG_IMAGE_RE = re.compile(r'<meta property="og:image" content="(.*?)">')
+_TWITTER_IMAGE_RE = re.compile(r'<meta name="twitter:image" content="(.*?)">')
+_HEAD_END_RE = re.compile(r"</head\s*>", re.IGNORECASE)
+
 def scrape_vrchat_image(url: str) -> str:
-    """Scrape og:image from VRChat world URL."""
+    """Scrape og:image from VRChat world URL.
+
+    Reads the page only until the image meta tag (or </head>) is found.
+    """
+    cache = get_default_cache()
     try:
-        # Rate limit
-        time.sleep(1) 
-        
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        if response.status_code != 200:
-            logger.warning(f"Failed to access {url}: status {response.status_code}")
+        if not cache.offline:  # no waiting when replaying recorded responses
+            IMAGE_LIMITER.acquire(url)
+        status_code, image_url = cache.get_parsed(
+            url,
+            IMAGE_PARSER_VERSION,
+            _parse_head_image,
+            headers=HEADERS,
+            timeout=10,
+        )
+        if status_code != 200:
+            logger.warning(f"Failed to access {url}: status {status_code}")
             return ""
-            
-        html = response.text
-        # Regex for og:image
-        match = re.search(r'<meta property="og:image" content="(.*?)">', html)
-        if match:
-            return match.group(1)
-        
-        # Try twitter:image
-        match = re.search(r'<meta name="twitter:image" content="(.*?)">', html)
-        if match:
-            return match.group(1)
-            
-        return ""
+        return image_url or ""
     except Exception as e:
         logger.warning(f"Error scraping {url}: {e}")
         return ""
 
+
+def _parse_head_image(partial_html: str) -> Optional[str]:
+    """get_parsed callback: the image URL once known, "" if the head ended without one."""
+    image_url = _extract_og_image(partial_html)
+    if image_url:
+        return image_url
+    if _HEAD_END_RE.search(partial_html):
+        return ""
+    return None
+
+
+@timed("resolve_world_images")
+def resolve_world_images(urls: list[str], max_workers: int = IMAGE_WORKERS) -> dict[str, str]:
+    """Resolve og:image for many world URLs concurrently (url -> image URL or "")."""
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    if not unique_urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_urls)))) as executor:
+        images = list(executor.map(scrape_vrchat_image, unique_urls))
+    return dict(zip(unique_urls, images))
+
+
+def _extract_og_image(html: str) -> str:
+    """Extract og:image (or twitter:image) URL from page HTML."""
+    match = _OG_IMAGE_RE.search(html)
+    if match:
+        return match.group(1)
+
+    match = _TWITTER_IMAGE_RE.search(html)
+    if match:
+        return match.group(1)
+
+    return ""
+
 def main():
     logger.info("Starting World Scraper...")
     
@@ -241,11 +257,15 @@ def main():
         source_items = fetch_csv_data(WORLD_CSV_URL)
     else:
         logger.info("Mode: HTML (Preserves author links)")
-        source_items = fetch_sheet_data(WORLD_SHEET_URL)
+        source_items = fetch_sheet_data(WORLD_GID)
         
     logger.info(f"Fetched {len(source_items)} items")
     
-    # 2. Process Items
+    # 2. Resolve thumbnails (concurrently, rate limited per host)
+    images = resolve_world_images([item['url'] for item in source_items])
+    logger.info(f"Resolved {sum(1 for image in images.values() if image)}/{len(images)} og:images")
+
+    # 3. Process Items
     final_items = []
     
     for item in source_items:
@@ -255,7 +275,7 @@ def main():
         image_url = ""
         
         # Try scraping first
-        scraped_image = scrape_vrchat_image(item['url'])
+        scraped_image = images.get(item['url'], "")
         if scraped_image:
             image_url = scraped_image
             logger.info("  -> Found og:image")
@@ -285,11 +305,14 @@ def main():
         }
         final_items.append(world_obj)
         
-    # 3. Save JSON
+    # 4. Save JSON
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
         json.dump(final_items, f, ensure_ascii=False, indent=2)
         
     logger.info(f"Saved {len(final_items)} worlds to {OUTPUT_FILE}")
+    get_default_cache().prune()
 
 if __name__ == "__main__":
-    main()
+    # --profile / --record-http / --replay-http (see profiler.py)
+    from profiler import profile_main
+    profile_main(main, "world", description="World scraper for VRC-LIFE Portal")
@@ -0,0 +1,88 @@
+"""
+ITEM LIST 検索用の転置インデックス
+
+アイテム名とショップ名を正規化し、文字 n-gram → アイテム番号 の転置インデックスを作る。
+フロントエンド（docs/js/fashion.js）は同じ正規化をクエリに適用し、
+n-gram のポスティングリストの積集合で候補を絞ってから部分一致を確認する。
+
+正規化（fashion.js の normalizeSearchText と同じ規則）:
+    1. NFKC（全角英数→半角、半角カナ→全角カナ など幅の違いを吸収）
+    2. 小文字化
+    3. カタカナ→ひらがな
+    4. 空白で区切ってトークン化
+
+インデックスするのは各トークンの 1-gram と 2-gram。
+クエリのトークンが1文字なら 1-gram、2文字以上なら 2-gram の積集合を使う。
+
+ファイル形式:
+    {
+      "version": 1,
+      "lastUpdated": "...",
+      "ids": ["booth-...", ...],            # アイテム番号 → id（items.json と同じ順）
+      "grams": {"ab": [3, 1, 10, ...], ...} # アイテム番号の昇順リストを差分で符号化
+    }
+"""
+
+import json
+import os
+import unicodedata
+from pathlib import Path
+
+INDEX_VERSION = 1
+# インデックス対象のフィールド
+SEARCH_FIELDS = ("name", "shopName")
+
+# カタカナ（ァ〜ヶ）→ ひらがな
+_KANA_TABLE = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+
+def normalize_search_text(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower().translate(_KANA_TABLE)
+
+
+def text_grams(text: str) -> set[str]:
+    """正規化済みテキストの 1-gram と 2-gram（トークン単位）。"""
+    grams = set()
+    for token in text.split():
+        grams.update(token)
+        grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return grams
+
+
+class SearchIndexBuilder:
+    """公開順に流れてくるアイテムから転置インデックスを作る。"""
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self._postings: dict[str, list[int]] = {}
+
+    def add(self, item: dict) -> None:
+        ordinal = len(self.ids)
+        self.ids.append(item["id"])
+        text = normalize_search_text(" ".join(str(item.get(field) or "") for field in SEARCH_FIELDS))
+        for gram in text_grams(text):
+            postings = self._postings.get(gram)
+            if postings is None:
+                self._postings[gram] = [ordinal]
+            else:
+                postings.append(ordinal)
+
+    def to_dict(self, last_updated: str) -> dict:
+        grams = {}
+        for gram in sorted(self._postings):
+            # 番号は追加順なので昇順。差分にすると数字が短くなる
+            previous = 0
+            deltas = []
+            for ordinal in self._postings[gram]:
+                deltas.append(ordinal - previous)
+                previous = ordinal
+            grams[gram] = deltas
+        return {"version": INDEX_VERSION, "lastUpdated": last_updated, "ids": self.ids, "grams": grams}
+
+    def write(self, path: Path, last_updated: str) -> None:
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(
+            json.dumps(self.to_dict(last_updated), ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
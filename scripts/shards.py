@@ -0,0 +1,178 @@
+"""
+フロントエンド向けのシャード出力
+
+items.json（全件）とは別に、ページごとに必要な分だけを切り出したファイルを書く。
+
+    shards/new-arrivals.json     最新 NEW_ARRIVALS_COUNT 件（トップページ用）
+    shards/type-<slug>.json      種別（type）ごと
+    shards/gender-<slug>.json    対象（category）ごと。category に "ALL" を含む
+                                 アイテムは全ての対象のシャードに入る
+    shards/search-index.json     名前・ショップ名検索用の転置インデックス（search_index.py）
+    shards/facets.json           対象・テイスト・種別のビットマップと件数（facet_index.py）
+    shards/manifest.json         上記ファイルの一覧と件数
+
+シャードは items.json と同じ {"lastUpdated", "items", "totalItems"} 形式で、
+空白なしで書き出す。並び順は items.json と同じ。
+カード表示に使わない description は省く（全文は items.json にある）。
+"""
+
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+from auto_tagger import GENDERS, TASTE_RULES
+from facet_index import FacetIndexBuilder
+from search_index import SearchIndexBuilder
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIR_NAME = "shards"
+MANIFEST_NAME = "manifest.json"
+NEW_ARRIVALS_NAME = "new-arrivals.json"
+SEARCH_INDEX_NAME = "search-index.json"
+FACET_INDEX_NAME = "facets.json"
+# トップページの NEW ARRIVALS に出す件数
+NEW_ARRIVALS_COUNT = 10
+
+# シャードに含めないフィールド
+SHARD_OMIT_FIELDS = ("description",)
+
+_SLUG_RE = re.compile(r"[^0-9a-z]+")
+
+
+def shard_slug(value: str) -> str:
+    """ファセット値をファイル名用に変換する（"TOOLS & SYSTEMS" → "tools-systems"）。"""
+    slug = _SLUG_RE.sub("-", value.lower().replace("'", "")).strip("-")
+    return slug or "other"
+
+
+class _ShardFile:
+    """1シャード分のストリーミング書き出し（一時ファイルに書いて close で置き換え）。"""
+
+    def __init__(self, path: Path, last_updated: str):
+        self.path = path
+        self.count = 0
+        self._tmp = path.with_name(f"{path.name}.tmp")
+        self._f = open(self._tmp, "w", encoding="utf-8")
+        self._f.write('{"lastUpdated":' + json.dumps(last_updated) + ',"items":[')
+
+    def add(self, encoded: str) -> None:
+        if self.count:
+            self._f.write(",")
+        self._f.write(encoded)
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.write(f'],"totalItems":{self.count}}}')
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+
+class ShardWriter:
+    """
+    公開順に流れてくるアイテムを各シャードに振り分けて書き出す。
+
+    Usage:
+        writer = ShardWriter(data_dir, last_updated)
+        for item in items:
+            writer.add(item)
+        writer.close()   # manifest.json を書き、使われなくなったシャードを消す
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        last_updated: str,
+        items_name: str = "items.json",
+        new_arrivals_count: int = NEW_ARRIVALS_COUNT,
+    ):
+        self.data_dir = Path(data_dir)
+        self.shard_dir = self.data_dir / SHARD_DIR_NAME
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        self.last_updated = last_updated
+        self.items_name = items_name
+        self.new_arrivals_count = new_arrivals_count
+        self.total = 0
+        self._new_arrivals = _ShardFile(self.shard_dir / NEW_ARRIVALS_NAME, last_updated)
+        self._types: dict[str, _ShardFile] = {}
+        self._genders: dict[str, _ShardFile] = {}
+        self._names = {NEW_ARRIVALS_NAME, MANIFEST_NAME, SEARCH_INDEX_NAME, FACET_INDEX_NAME}
+        self._search = SearchIndexBuilder()
+        self._facets = FacetIndexBuilder(GENDERS, tuple(TASTE_RULES))
+
+    def _shard(self, shards: dict[str, _ShardFile], prefix: str, value: str) -> _ShardFile:
+        shard = shards.get(value)
+        if shard is None:
+            name = f"{prefix}-{shard_slug(value)}.json"
+            n = 2
+            while name in self._names:
+                # 記号違いなどで slug が衝突した場合
+                name = f"{prefix}-{shard_slug(value)}-{n}.json"
+                n += 1
+            self._names.add(name)
+            shard = _ShardFile(self.shard_dir / name, self.last_updated)
+            shards[value] = shard
+        return shard
+
+    def add(self, item: dict) -> None:
+        self.total += 1
+        self._search.add(item)
+        self._facets.add(item)
+        # 1アイテムは複数のシャードに入るので、エンコードは1回だけ
+        encoded = json.dumps(
+            {k: v for k, v in item.items() if k not in SHARD_OMIT_FIELDS},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        if self._new_arrivals.count < self.new_arrivals_count:
+            self._new_arrivals.add(encoded)
+
+        if item.get("type"):
+            self._shard(self._types, "type", item["type"]).add(encoded)
+
+        categories = item.get("category") or []
+        if not isinstance(categories, list):
+            categories = [categories]
+        genders = set(GENDERS) if "ALL" in categories else set()
+        genders.update(c for c in categories if c != "ALL")
+        for gender in sorted(genders):
+            self._shard(self._genders, "gender", gender).add(encoded)
+
+    def close(self) -> dict:
+        """全シャードを確定させ、manifest.json を書いてその内容を返す。"""
+        def entry(shard: _ShardFile) -> dict:
+            shard.close()
+            return {"file": f"{SHARD_DIR_NAME}/{shard.path.name}", "count": shard.count}
+
+        manifest = {
+            "lastUpdated": self.last_updated,
+            "totalItems": self.total,
+            "items": {"file": self.items_name, "count": self.total},
+            "newArrivals": entry(self._new_arrivals),
+            "types": {value: entry(shard) for value, shard in self._types.items()},
+            "genders": {value: entry(shard) for value, shard in self._genders.items()},
+            "search": {"file": f"{SHARD_DIR_NAME}/{SEARCH_INDEX_NAME}", "count": self.total},
+            "facets": {"file": f"{SHARD_DIR_NAME}/{FACET_INDEX_NAME}", "count": self.total},
+        }
+        self._search.write(self.shard_dir / SEARCH_INDEX_NAME, self.last_updated)
+        self._facets.write(self.shard_dir / FACET_INDEX_NAME, self.last_updated)
+
+        # 前回まであって今回なくなった種別・対象のシャードを消す
+        written = {shard.path.name for shard in (*self._types.values(), *self._genders.values())}
+        for path in self.shard_dir.glob("*.json"):
+            if path.name.startswith(("type-", "gender-")) and path.name not in written:
+                path.unlink()
+
+        manifest_path = self.shard_dir / MANIFEST_NAME
+        tmp = manifest_path.with_name(f"{MANIFEST_NAME}.tmp")
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, manifest_path)
+
+        logger.info(
+            f"  シャード出力: 種別 {len(self._types)} / 対象 {len(self._genders)} / "
+            f"新着 {self._new_arrivals.count} 件 ({self.shard_dir})"
+        )
+        return manifest
+
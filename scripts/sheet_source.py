@@ -0,0 +1,255 @@
+"""
+Googleスプレッドシート（ウェブに公開）の取得元
+
+WORLD / KNOWLEDGE などの各シートは同じブックのタブ。
+ブック全体の pubhtml（全タブの表を含む）を1回の実行につき1回だけ取得し、
+各スクレイパーには gid で見つけた自分のタブの表だけを渡す。
+
+pubhtml の構造:
+    <ul id="sheet-menu">
+      <li id="sheet-button-<gid>"><a ...>タブ名</a></li> ...
+    </ul>
+    <div id="sheets-viewport">
+      <div id="<gid>"> ... <table class="waffle">...</table> ... </div> ...
+    </div>
+
+表はタブごとに1つで入れ子にならないので、木を作らずに文字列の位置で切り出す。
+
+表の行は iter_table_rows() がパースしながら1行ずつ返す（DOM は作らない）。
+ブックはタブ1つだけが必要なスクレイパー（WORLD）でも丸ごと取得してメモリに持つ
+（KNOWLEDGE と共有するので、ダウンロードは1回）。
+列の位置はヘッダー行の列名から split_header() で引く。
+"""
+
+import logging
+import re
+import threading
+from collections.abc import Iterable, Iterator
+from html import unescape
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional, Union
+
+from http_cache import get_default_cache
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ98u4MEiJ3o8jesqRUMv7hrg8atUwxQoIggjMlRWlHFCeCNDCObcde1cjOVXKVW5BFscQe7Z5zsG2_/pubhtml"
+# WORLD タブ
+WORLD_GID = "162444085"
+
+HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+_SHEET_BUTTON_RE = re.compile(r'<li id="sheet-button-(\d+)"[^>]*>.*?<a[^>]*>(.*?)</a>', re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class Workbook:
+    """取得済みのブック（pubhtml）。タブ名・gid から表の HTML を引く。"""
+
+    def __init__(self, html: str):
+        self.html = html
+        self.sheets: dict[str, str] = {}  # タブ名 → gid
+        for gid, label in _SHEET_BUTTON_RE.findall(html):
+            self.sheets[unescape(_TAG_RE.sub("", label)).strip()] = gid
+
+    def gid_for(self, name: str) -> Optional[str]:
+        """タブ名（部分一致）から gid を返す。"""
+        for sheet_name, gid in self.sheets.items():
+            if name in sheet_name:
+                return gid
+        return None
+
+    def table_html(self, gid: Optional[str] = None) -> Optional[str]:
+        """gid のタブの <table>…</table> を返す。gid 省略時は最初の表（単一シートの出力用）。"""
+        start = 0
+        if gid is not None:
+            start = self.html.find(f'<div id="{gid}"')
+            if start < 0:
+                return None
+        table_start = self.html.find("<table", start)
+        if table_start < 0:
+            return None
+        table_end = self.html.find("</table>", table_start)
+        if table_end < 0:
+            return None
+        return self.html[table_start:table_end + len("</table>")]
+
+
+_workbooks: dict[str, Workbook] = {}
+_workbook_locks: dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def get_workbook(url: str = WORKBOOK_URL) -> Workbook:
+    """
+    ブックを取得する（同じ URL はプロセス内で1回だけ取得し、以降は使い回す）。
+
+    複数のスクレイパーが並行に呼んでも、ダウンロードは最初の1回だけ。
+    取得に失敗した場合は例外を送出し、次の呼び出しで再度取得を試みる。
+    """
+    with _lock:
+        lock = _workbook_locks.setdefault(url, threading.Lock())
+    with lock:
+        workbook = _workbooks.get(url)
+        if workbook is None:
+            logger.info(f"Fetching workbook from {url}")
+            response = get_default_cache().get(url, headers=HEADERS, timeout=30)
+            response.encoding = "utf-8"
+            response.raise_for_status()
+            workbook = Workbook(response.text)
+            logger.info(f"  シート: {', '.join(workbook.sheets) or '(タブ一覧なし)'}")
+            _workbooks[url] = workbook
+        return workbook
+
+
+def clear_workbooks() -> None:
+    """取得済みのブックを捨てる（次の get_workbook で取り直す）。"""
+    with _lock:
+        _workbooks.clear()
+
+
+def get_sheet_table(gid: Optional[str] = None, name: Optional[str] = None, url: str = WORKBOOK_URL) -> Optional[str]:
+    """
+    ブックから1タブ分の表の HTML を返す。
+
+    gid が無ければ name（タブ名）から探し、それも見つからなければ最初の表を返す。
+    """
+    workbook = get_workbook(url)
+    if gid is None and name is not None:
+        gid = workbook.gid_for(name)
+        if gid is None:
+            logger.warning(f"Could not find sheet tab for {name}. Falling back to the first table.")
+        else:
+            logger.info(f"Found {name} sheet with GID: {gid}")
+    return workbook.table_html(gid)
+
+
+# --- 表の行の読み出し ---
+
+class Cell(NamedTuple):
+    """表の1セル（<td>）。"""
+
+    text: str  # テキスト片ごとに strip して連結したもの（bs4 の get_text(strip=True) と同じ）
+    raw: str   # strip せず、<br> と </p> を改行にしたもの（本文など複数行のセル用）
+    link: str  # セル内で最初のリンクの href（無ければ ""）
+
+
+EMPTY_CELL = Cell("", "", "")
+
+Row = tuple[Cell, ...]
+
+_FEED_CHUNK = 64 * 1024
+
+
+class _TableRowParser(HTMLParser):
+    """<tr> が閉じるたびに rows へ1行を追加するイベント駆動パーサ。<th>（行番号など）は含めない。"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list[Row] = []
+        self._row: Optional[list[Cell]] = None
+        self._texts: Optional[list[str]] = None  # 開いているセルのテキスト片
+        self._raw: list[str] = []
+        self._link = ""
+        self._data: list[str] = []  # タグ間の連続テキスト（handle_data は分割されて届くことがある）
+
+    def _flush_data(self) -> None:
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if self._texts is not None:
+            stripped = data.strip()
+            if stripped:
+                self._texts.append(stripped)
+            self._raw.append(data)
+
+    def _close_cell(self) -> None:
+        self._flush_data()
+        if self._texts is not None and self._row is not None:
+            self._row.append(Cell("".join(self._texts), "".join(self._raw), self._link))
+        self._texts = None
+
+    def _close_row(self) -> None:
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append(tuple(self._row))
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_data()
+        if tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag == "td":
+            self._close_cell()
+            if self._row is not None:
+                self._texts, self._raw, self._link = [], [], ""
+        elif self._texts is not None:
+            if tag == "br":
+                self._raw.append("\n")
+            elif tag == "a" and not self._link:
+                self._link = dict(attrs).get("href") or ""
+
+    def handle_endtag(self, tag):
+        self._flush_data()
+        if tag == "td":
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "p" and self._texts is not None:
+            self._raw.append("\n")
+
+    def handle_data(self, data):
+        if self._texts is not None:
+            self._data.append(data)
+
+
+def iter_table_rows(html: Union[str, Iterable[str]]) -> Iterator[Row]:
+    """
+    表の HTML から <td> のセルの行を順に返す。
+
+    html は文字列か文字列のイテラブル（レスポンスのチャンクなど）。
+    少しずつパーサに流し、閉じた行からすぐに返すので、パーサ側（行・セルの木）のメモリは
+    表の大きさによらず一定。ただし get_sheet_table() の表はメモリ上のブックから切り出した
+    文字列なので、全体のメモリはブック（全タブ）の大きさに比例する。
+    """
+    if isinstance(html, str):
+        chunks = (html[i:i + _FEED_CHUNK] for i in range(0, len(html), _FEED_CHUNK))
+    else:
+        chunks = html
+    parser = _TableRowParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.rows:
+            yield from parser.rows
+            parser.rows = []
+    parser.close()
+    parser._close_row()
+    yield from parser.rows
+
+
+def row_cell(row: Row, index: int) -> Cell:
+    """行の index 番目のセル（範囲外・index < 0 なら EMPTY_CELL）。"""
+    if 0 <= index < len(row):
+        return row[index]
+    return EMPTY_CELL
+
+
+def split_header(rows: Iterable[Row], key: str) -> tuple[dict[str, int], Iterator[Row]]:
+    """
+    key（小文字）を含む最初の行をヘッダーとし、(列名（小文字） → 列番号, 残りの行) を返す。
+
+    同じ列名が複数あれば最初の列。ヘッダーが見つからなければ ({}, 空のイテレータ)。
+    """
+    rows = iter(rows)
+    for row in rows:
+        names = [cell.text.lower() for cell in row]
+        if key in names:
+            columns: dict[str, int] = {}
+            for index, name in enumerate(names):
+                columns.setdefault(name, index)
+            return columns, rows
+    return {}, iter(())
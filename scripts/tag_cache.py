@@ -0,0 +1,120 @@
+"""
+タグ付け結果のキャッシュ
+
+アイテムのタグは name / description / manual_gender / manual_item_type と
+タグ付けルールだけで決まるため、これらのハッシュをキーに結果を保存しておき、
+変化のないアイテムはタグ付けをスキップする。
+
+ルールセットのバージョン（auto_tagger.RULESET_VERSION）はキーとファイルの両方に含める。
+ルールを変更するとバージョンが変わり、古いキャッシュは丸ごと破棄される。
+
+環境変数:
+    VRC_TAG_CACHE_PATH   キャッシュファイル（デフォルト: <repo>/.cache/tags.json）
+    VRC_TAG_CACHE        "0" / "off" で無効化
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "tags.json"
+
+# キャッシュから復元するタグ付け結果のフィールド
+TAG_FIELDS = ("category", "taste", "type", "display_type")
+
+
+def tag_key(item: dict, version: str) -> str:
+    """タグ付けの入力とルールセットのバージョンからキャッシュキーを作る。"""
+    source = json.dumps(
+        [
+            item.get("name", ""),
+            item.get("description", ""),
+            item.get("manual_gender", ""),
+            item.get("manual_item_type", ""),
+            version,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class TagCache:
+    """キー → タグ付け結果 の JSON ファイルキャッシュ。
+
+    save() 時には今回の実行で参照・追加されたエントリだけを書き出すため、
+    カタログから消えたアイテムの結果は溜まっていかない。
+    """
+
+    def __init__(self, version: str, path: Optional[Path] = None, enabled: bool = True):
+        self.version = version
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.enabled = enabled
+        self._entries: dict[str, dict] = {}
+        self._used: dict[str, dict] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        if enabled:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"タグキャッシュの読み込みに失敗しました（作り直します）: {e}")
+            return
+        if data.get("version") != self.version:
+            logger.info("タグ付けルールが変更されたため、タグキャッシュを破棄します")
+            return
+        self._entries = data.get("entries", {})
+
+    def key(self, item: dict) -> str:
+        """タグ付け前のアイテムのキャッシュキー（manual_* が消える前に計算すること）。"""
+        return tag_key(item, self.version)
+
+    def get(self, key: str) -> Optional[dict]:
+        """キャッシュ済みのタグ付け結果を返す（無ければ None）。"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._used[key] = entry
+        return entry
+
+    def put(self, key: str, tagged: dict) -> None:
+        """タグ付け済みアイテムの結果を保存する。"""
+        if not self.enabled:
+            return
+        entry = {field: tagged[field] for field in TAG_FIELDS}
+        self._entries[key] = entry
+        self._used[key] = entry
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        tmp.write_text(
+            json.dumps({"version": self.version, "entries": self._used}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+        logger.info(
+            f"タグキャッシュ: ヒット {self.stats['hits']} / ミス {self.stats['misses']} / "
+            f"保存 {len(self._used)} 件"
+        )
+
+
+def get_default_tag_cache(version: str) -> TagCache:
+    """環境変数に従ってタグキャッシュを作る。"""
+    path = os.environ.get("VRC_TAG_CACHE_PATH")
+    enabled = os.environ.get("VRC_TAG_CACHE", "1").lower() not in ("0", "off", "false", "no")
+    return TagCache(version, path=Path(path) if path else None, enabled=enabled)
@@ -0,0 +1,226 @@
+"""
+ホスト単位のリクエスト間隔制御（トークンバケット）
+
+複数スレッドから同じホストへ同時にリクエストしても、
+ホストごとのマナー設定（最小リクエスト間隔）を全体で守るための仕組み。
+
+AdaptiveRateLimiter はサーバーの応答に合わせて間隔を変える（AIMD）。
+429 / 503 で間隔を倍にし（Retry-After があればその間ホストへの送信を止める）、
+正常な応答が続く間は少しずつ最小間隔まで戻す。
+"""
+
+import random
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+# サーバーが混雑・制限を示すステータス（間隔を広げる）
+THROTTLE_STATUSES = frozenset({429, 503})
+# 再試行してよい一時的なエラー
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット。
+
+    トークンを先に予約してからロック外で待機するため、
+    待機中のスレッドが他スレッドの予約を妨げない（先着順で枠が割り当てられる）。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        # pause() で予約済みの枠を後ろにずらした秒数の累計（待機中のスレッドが起きた後に確認する）
+        self._shifted = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        # _updated が未来（pause 中）なら、その時刻まではトークンを増やさない
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、使用可能になるまでの待機秒数を返す。"""
+        return self._reserve()[0]
+
+    def _reserve(self) -> tuple[float, float]:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            ready = self._updated + max(0.0, -self._tokens) / self.rate
+            return max(0.0, ready - now), self._shifted
+
+    def set_rate(self, rate: float) -> None:
+        """補充速度を変える（それまでに溜まった分は元の速度で計算する）。"""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """
+        今から seconds 秒間は新しい枠を出さない（予約済みの枠も同じだけ後ろにずれる）。
+
+        acquire() で待機中のスレッドは、起きた時点でずれた分を追加で待つ。
+        reserve() で待機秒数だけを受け取った呼び出し側には反映されない。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._updated:
+                self._shifted += until - self._updated
+                self._updated = until
+                self._tokens = min(self._tokens, 0.0)
+
+    def acquire(self) -> float:
+        """トークンを1つ取得する（必要なら待機）。実際に待った秒数を返す。"""
+        wait, shifted = self._reserve()
+        waited = 0.0
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            # 待機中に pause() されたら、その分だけ枠が後ろにずれている
+            with self._lock:
+                wait, shifted = self._shifted - shifted, self._shifted
+        return waited
+
+
+def default_host_key(url: str) -> str:
+    """URLからレート制御用のホストキーを得る。"""
+    return urlparse(url).netloc.lower()
+
+
+class HostRateLimiter:
+    """ホストごとに TokenBucket を持つレートリミッタ。
+
+    Args:
+        interval: 同一ホストへのリクエスト間隔（秒）
+        burst: 連続で即時発行できるリクエスト数
+        key_func: URL→ホストキー変換（サブドメインをまとめる場合などに差し替える）
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        burst: float = 1.0,
+        key_func: Optional[Callable[[str], str]] = None,
+    ):
+        self.interval = interval
+        self.burst = burst
+        self.key_func = key_func or default_host_key
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        key = self.key_func(url)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate=1.0 / self.interval, capacity=self.burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def acquire(self, url: str) -> float:
+        """URLのホストの枠が空くまで待機する。"""
+        return self.bucket_for(url).acquire()
+
+    def record(self, url: str, status: int, retry_after: Optional[float] = None) -> None:
+        """応答の結果を伝える（固定間隔なので何もしない。AdaptiveRateLimiter 用）。"""
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """応答に合わせてホストごとの間隔を変えるレートリミッタ（AIMD）。
+
+    - 429 / 503: 間隔を backoff 倍（max_interval まで）。同時に送信中だったリクエストの
+      応答で何度も倍にならないよう、広げるのは現在の間隔につき1回まで。
+      Retry-After があればその秒数だけホストへの送信を止める。
+    - それ以外の応答: 間隔を recover 秒ずつ縮める（interval まで）。
+
+    interval はマナー設定の最小間隔で、これより速くはならない。
+
+    Args:
+        interval: 最小のリクエスト間隔（秒）
+        max_interval: 最大のリクエスト間隔（秒）
+        backoff: 制限されたときに間隔に掛ける倍率
+        recover: 正常な応答1回ごとに縮める秒数
+        max_pause: Retry-After に従って止める最大秒数
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        max_interval: float = 60.0,
+        backoff: float = 2.0,
+        recover: float = 0.25,
+        max_pause: float = 300.0,
+        burst: float = 1.0,
+        key_func: Optional[Callable[[str], str]] = None,
+    ):
+        super().__init__(interval, burst=burst, key_func=key_func)
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.recover = recover
+        self.max_pause = max_pause
+        self._intervals: dict[str, float] = {}
+        self._backed_off_at: dict[str, float] = {}
+
+    def current_interval(self, url: str) -> float:
+        with self._lock:
+            return self._intervals.get(self.key_func(url), self.interval)
+
+    def record(self, url: str, status: int, retry_after: Optional[float] = None) -> None:
+        key = self.key_func(url)
+        bucket = self.bucket_for(url)
+        now = time.monotonic()
+        with self._lock:
+            current = self._intervals.get(key, self.interval)
+            if status in THROTTLE_STATUSES:
+                if now - self._backed_off_at.get(key, float("-inf")) >= current:
+                    updated = min(self.max_interval, current * self.backoff)
+                    self._backed_off_at[key] = now
+                else:
+                    updated = current
+            else:
+                updated = max(self.interval, current - self.recover)
+            self._intervals[key] = updated
+        if updated != current:
+            bucket.set_rate(1.0 / updated)
+        if retry_after and status in THROTTLE_STATUSES:
+            bucket.pause(min(retry_after, self.max_pause))
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Retry-After ヘッダー（秒数 or HTTP日付）を秒数で返す。無い・読めなければ None。"""
+    value = None
+    for name, header in headers.items():
+        if name.lower() == "retry-after":
+            value = header.strip()
+            break
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """attempt 回目（0始まり）の再試行までの待機秒数（full jitter: 0〜base*2^attempt の一様乱数）。"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+from profiler import Profiler
+
+
+def _work(n):
+    return sum(i * i for i in range(n))
+
+
+def test_stage_with_thread_pool(tmp_path):
+    """スレッドプールを含むステージを計測しても止まらず、ワーカーの分も集計される。"""
+    profiler = Profiler(tmp_path)
+    results = []
+
+    def run():
+        with profiler.stage("pool"):
+            with ThreadPoolExecutor(4) as executor:
+                results.extend(executor.map(_work, [20000] * 16))
+
+    runner = threading.Thread(target=run, daemon=True)
+    runner.start()
+    runner.join(timeout=60)
+    assert not runner.is_alive(), "profiled stage with a thread pool did not finish"
+
+    assert results == [_work(20000)] * 16
+    assert (tmp_path / "pool.prof").exists()
+    assert (tmp_path / "pool.collapsed").exists()
+    profiler.write_summary()
+    summary = json.loads((tmp_path / "summary.json").read_text(encoding="utf-8"))
+    assert summary["stages"]["pool"]["threads"] > 1
+    assert "_work" in (tmp_path / "pool.txt").read_text(encoding="utf-8")